@@ -0,0 +1,174 @@
+# BatchDumper
+# - class to dump the presets for all devices in the song
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+
+# Python imports
+import os
+import queue
+import sys
+import threading
+import time
+
+# Local imports
+from .config import *
+from .ElectraOneBase import ElectraOneBase
+from .ElectraOneDumper import ElectraOneDumper
+from .PresetInfo import write_if_changed
+from .RefreshJob import RefreshJob
+
+class BatchDumper(ElectraOneBase):
+    """Dump the presets constructed on the fly for all devices in the song
+       (on all tracks, return tracks and the master track), each unique
+       device once, to the dumps folder. Presets are constructed in small
+       steps (one preset per step) over several calls to update_display
+       (see RefreshJob); the files are written by a separate thread, and
+       only if their contents changed. When done, the time to construct
+       and the size of every preset is reported in the log.
+    """
+
+    def __init__(self, c_instance):
+        """Initialise.
+           - c_instance: Live interface object (see __init.py__)
+        """
+        ElectraOneBase.__init__(self, c_instance)
+        self._job = None
+
+    def is_running(self):
+        """Return whether a batch dump is in progress
+           - result: bool
+        """
+        return self._job != None
+
+    def start(self):
+        """Start a batch dump (unless one is in progress already).
+        """
+        if self._job:
+            self.debug(1,'Batch dump already in progress; ignored.')
+            return
+        self.debug(1,'Starting batch dump.')
+        path = self.dumppath()
+        try:
+            os.makedirs(path, exist_ok=True)
+        except:
+            self.warning(f'Batch dump aborted: {sys.exc_info()[1]}')
+            return
+        self.show_message('E1: dumping presets for all devices.')
+        # files to write are passed to the writer thread through the queue;
+        # None signals the end of the batch (a daemon thread, so it never
+        # keeps Live from exiting)
+        files = queue.Queue()
+        report = []
+        writer = threading.Thread(target=self.__write_files, args=(files,report), daemon=True)
+        writer.start()
+        self._job = RefreshJob('batch dump', self._dump_steps(path,files,report), self.debug)
+        # start the job now: a generator cancelled before it started would
+        # never tell the writer thread that the batch ended
+        self.update_display()
+
+    def _get_song_devices(self):
+        """Return all devices in the song: on all tracks, return tracks and
+           the master track (including devices in racks).
+           - result: ; [Live.Device.Device]
+        """
+        song = self.song()
+        devices = []
+        for track in list(song.tracks) + list(song.return_tracks) + [song.master_track]:
+            devices.extend(self.get_track_devices_flat(track))
+        return devices
+
+    def _dump_steps(self, path, files, report):
+        """Generator dumping the presets of all devices, one preset per step.
+           The writer thread is always told when the batch ends (also when
+           it is cancelled or fails).
+           - path: folder to dump into; Path
+           - files: queue to pass files to write to the writer thread; queue.Queue
+           - report: list to append the name, construction time (in ms) and
+             size of every preset to; [(str,float,int)]
+        """
+        try:
+            dumped = set()
+            for device in self._get_song_devices():
+                yield
+                # (the device may have been deleted since)
+                if not device:
+                    continue
+                device_name = self.get_device_name(device)
+                if device_name in dumped:
+                    continue
+                dumped.add(device_name)
+                group = 0
+                group_count = 1
+                while group < group_count:
+                    start = time.perf_counter()
+                    dumper = ElectraOneDumper(self.get_c_instance(), device, group=group)
+                    preset_info = dumper.get_preset_info()
+                    elapsed = 1000 * (time.perf_counter() - start)
+                    group_count = preset_info.get_group_count()
+                    # (named like EffectController names presets for groups)
+                    name = device_name if group == 0 else f'{device_name}-{group+1}'
+                    report.append((name, elapsed, len(preset_info.get_preset())))
+                    # (the contents of the CC map are computed here, as the
+                    # device must not be accessed from another thread)
+                    for f in preset_info.dump_contents(device, name, path):
+                        files.put(f)
+                    group += 1
+                    if group < group_count:
+                        yield
+        finally:
+            files.put(None)
+
+    def __write_files(self, files, report):
+        """To be called as a thread. Write the files passed through the
+           queue until None is received, and then report.
+           - files: queue of files to write; queue.Queue of (str,bytes)
+           - report: name, construction time (in ms) and size of every
+             preset dumped; [(str,float,int)]
+        """
+        # should anything happen inside this thread, make sure we write to debug
+        try:
+            written = 0
+            unchanged = 0
+            while True:
+                f = files.get()
+                if f == None:
+                    break
+                (fname,contents) = f
+                if write_if_changed(fname,contents):
+                    written += 1
+                else:
+                    unchanged += 1
+            # (the report is complete once None was received)
+            self.log_message(f'batch dump of {len(report)} presets; {written} files written, {unchanged} unchanged.')
+            for (name,elapsed,size) in report:
+                self.log_message(f'{name}: {size} bytes ({elapsed:.1f} ms).')
+            total = sum(elapsed for (name,elapsed,size) in report)
+            self.log_message(f'batch dump total: {sum(size for (name,elapsed,size) in report)} bytes ({total:.0f} ms).')
+        except:
+            self.debug(1,f'Exception occured {sys.exc_info()}')
+
+    def update_display(self):
+        """Called every 100 ms; continue the batch dump in progress (if any)
+           within REFRESH_TIME_BUDGET.
+        """
+        if self._job:
+            try:
+                if self._job.run(REFRESH_TIME_BUDGET):
+                    self._job = None
+                    self.show_message('E1: presets for all devices dumped.')
+            except:
+                self._job = None
+                self.warning(f'Batch dump aborted: {sys.exc_info()[1]}')
+
+    def disconnect(self):
+        """Cancel a batch dump in progress (if any)
+        """
+        if self._job:
+            self._job.cancel()
+            self._job = None
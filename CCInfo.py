@@ -23,14 +23,29 @@ import ast
 from .config import MIDI_EFFECT_CHANNEL, UNMAPPED_ID
 from .UniqueParameters import make_device_parameters_unique
 
-class CCInfo:
+def _check_control_id(id):
+    """Check that id is a valid control id, i.e. a tuple (control_id,value_id)
+       - id: control id to check; tuple of int,int
+    """
+    assert type(id) is tuple, f'Control id {id} should be tuple.'
+    (cid,vid) = id
+    assert cid in range(-1,443), f'Control index {cid} out of range.'
+    assert vid in range(11), f'Value index {vid} out of range.'
+
+class CCInfo ( tuple ):
     """Class storing the channel and parameter number of a CC mapping, and
        whether the associated controller on the E1 is 14bit (or not, in
        which case it is 7bit). Also records the index of that controller in
        the E1 preset.
+       CCInfo objects are immutable tuples
+       (control_id, MIDI_channel, is_cc14?, CC_parameter_no), to keep the
+       (potentially large) CC maps compact; use with_cc_no() and
+       with_control_id() to obtain a modified copy.
     """
 
-    def __init__(self, v):
+    __slots__ = ()
+    
+    def __new__(cls, v):
         """Initialise with a tuple
            (control_id, MIDI_channel, is_cc14?, CC_parameter_no).
            Where is_cc14? is IS_CC7 when the parameter is 7bit, IS_CC14 if 14bit.
@@ -43,50 +58,49 @@ class CCInfo:
            for non-ADSR controls
         """
         assert type(v) is tuple, f'{v} should be tuple but is {type(v)}'
-        (id, self._midi_channel, self._is_cc14, self._cc_no) = v
+        (id, midi_channel, is_cc14, cc_no) = v
         if type(id) is int:
             assert id in range(-1,443), f'Control index {id} out of range.'
-            self._control_id = (id,0)
+            id = (id,0)
         else:
             assert type(id) is tuple, f'Control id {id} should be an integer or a tuple.'
-            (cid,vid) = id
-            assert cid in range(-1,443), f'Control index {cid} out of range.'
-            assert vid in range(11), f'Value index {vid} out of range.'
-            self._control_id = id
-        assert self._midi_channel in range(1,17), f'MIDI channel {self._midi_channel} out of range.'
-        assert self._is_cc14 in [IS_CC7,IS_CC14], f'CC14 flag {self._is_cc14} out of range.'
-        assert self._cc_no in range(-1,128), f'CC parameter number {self._cc_no} out of range.'
+            _check_control_id(id)
+        assert midi_channel in range(1,17), f'MIDI channel {midi_channel} out of range.'
+        assert is_cc14 in [IS_CC7,IS_CC14], f'CC14 flag {is_cc14} out of range.'
+        assert cc_no in range(-1,128), f'CC parameter number {cc_no} out of range.'
+        return tuple.__new__(cls, (id, midi_channel, is_cc14, cc_no))
         
     def __repr__(self):
         """Return a string representation of CCInfo as a tuple of its values.
         """
-        return f'({self._control_id},{self._midi_channel},{self._is_cc14},{self._cc_no})'
+        return f'({self[0]},{self[1]},{self[2]},{self[3]})'
         
     def get_midi_channel(self):
         """Return the MIDI channel this object is mapped to (undefined if not mapped)
            - result: channel; int (1..16)
         """
-        return self._midi_channel
+        return self[1]
 
     def is_cc14(self):
         """Return whether the object represents a 7 or 14 bit CC parameter 
            (undefiend when not mapped).
            - result: IC_CC14/True if 14 bit; ID_CC7/False if 7 bit;  bool
         """
-        return self._is_cc14
+        return self[2]
 
     def get_cc_no(self):
         """Return the CC parameter number of this object.
            - result: the CC parameter number (-1 if not mapped); int (-1..127)
         """
-        return self._cc_no
+        return self[3]
 
-    def set_cc_no(self,cc_no):
-        """Set the CC parameter number of this object.
+    def with_cc_no(self,cc_no):
+        """Return a copy of this object with a different CC parameter number.
            - cc_no: the CC parameter number (-1 if not mapped); int (-1..127)
+           - result: the modified copy; CCInfo
         """
         assert cc_no in range(-1,128), f'CC-no out of range {cc_no}.'
-        self._cc_no = cc_no
+        return CCInfo((self[0],self[1],self[2],cc_no))
     
     def get_control_id(self):
         """Return the E1 preset control id of this object; always returned as a tuple!.
@@ -94,33 +108,65 @@ class CCInfo:
              If (-1,dc) then E1 will locally generate value to display; otherwise
              Ableton is expected to send value string to display
         """
-        return self._control_id
+        return self[0]
 
-    def set_control_id(self,id):
-        """Set the E1 preset control id of this object.
+    def with_control_id(self,id):
+        """Return a copy of this object with a different E1 preset control id.
            - id: value to set control id to; tuple of int,int
              If (-1,dc) then E1 will locally generate value to display; otherwise
              Ableton is expected to send value string to display
+           - result: the modified copy; CCInfo
         """
-        assert type(id) is tuple, f'Control id {id} should be tuple.'
-        (cid,vid) = id
-        assert cid in range(-1,443), f'Control index {cid} out of range.'
-        assert vid in range(11), f'Value index {vid} out of range.'
-        self._control_id = id
+        _check_control_id(id)
+        return CCInfo((id,self[1],self[2],self[3]))
 
     def is_mapped(self):
         """Return whether object is mapped to a CC parameter at all.
            - result: whether mapped or not ; bool
         """
-        return self._cc_no != UNMAPPED_CC
+        return self[3] != UNMAPPED_CC
 
 # CCInfo object for an unmapped parameter
 UNMAPPED_CCINFO = CCInfo((UNMAPPED_ID,MIDI_EFFECT_CHANNEL,IS_CC7,UNMAPPED_CC))
 
 
+def _add_to_index(index,key,par_name):
+    """Add par_name to the list of names stored for key in index.
+    """
+    if key in index:
+        index[key].append(par_name)
+    else:
+        index[key] = [par_name]
+
+def _remove_from_index(index,key,par_name):
+    """Remove par_name from the list of names stored for key in index.
+    """
+    names = index[key]
+    names.remove(par_name)
+    if len(names) == 0:
+        del index[key]
+
+def _cc_keys(ccinfo):
+    """Return the (MIDI channel, CC parameter number) pairs used by a mapped
+       parameter: a 14bit CC also uses the CC parameter number + 32.
+       - ccinfo: ; CCInfo
+       - result: ; list of (int,int)
+    """
+    channel = ccinfo.get_midi_channel()
+    cc_no = ccinfo.get_cc_no()
+    if ccinfo.is_cc14():
+        return [(channel,cc_no),(channel,cc_no+32)]
+    else:
+        return [(channel,cc_no)]
+
 class CCMap ( dict ) :
     """Class storing a CC map: a dictionary indexed by parameter.original_name
        returning the CCInfo for this parameter.
+       Also maintains a reverse index from (MIDI channel, CC parameter number)
+       to the names of the parameters mapped to it (only for mapped
+       parameters; a 14bit CC is indexed under both CC parameter numbers it
+       uses). All methods that add or remove entries keep this index
+       consistent.
     """
 
     def __init__(self,cc_map):
@@ -133,6 +179,8 @@ class CCMap ( dict ) :
         # we could simply do dict.__init__(self,cc_map), but this is safer, checking
         # all entries in the dict
         dict.__init__(self,{})
+        # { (channel,cc_no): [parameter names] }
+        self._cc_index = {}
         for par_name in cc_map:
             value = cc_map[par_name]
             # skip None entries
@@ -144,6 +192,45 @@ class CCMap ( dict ) :
                     ccinfo = value 
                 self[par_name] = ccinfo
 
+    def __setitem__(self,par_name,ccinfo):
+        if par_name in self:
+            self.__delitem__(par_name)
+        dict.__setitem__(self,par_name,ccinfo)
+        if ccinfo.is_mapped():
+            for key in _cc_keys(ccinfo):
+                _add_to_index(self._cc_index,key,par_name)
+    
+    def __delitem__(self,par_name):
+        ccinfo = self[par_name]
+        dict.__delitem__(self,par_name)
+        if ccinfo.is_mapped():
+            for key in _cc_keys(ccinfo):
+                _remove_from_index(self._cc_index,key,par_name)
+
+    def pop(self,par_name,*default):
+        if (par_name not in self) and (len(default) > 0):
+            return default[0]
+        ccinfo = self[par_name]
+        del self[par_name]
+        return ccinfo
+
+    def popitem(self):
+        (par_name,ccinfo) = dict.popitem(self)
+        # (put it back, to remove it with the index updated)
+        dict.__setitem__(self,par_name,ccinfo)
+        del self[par_name]
+        return (par_name,ccinfo)
+
+    def setdefault(self,par_name,ccinfo=None):
+        if par_name not in self:
+            assert type(ccinfo) == CCInfo, f'{ccinfo} should be of type CCInfo'
+            self[par_name] = ccinfo
+        return self[par_name]
+
+    def clear(self):
+        dict.clear(self)
+        self._cc_index = {}
+        
     def map(self,parameter,ccinfo):
         """Map the parameter using ccinfo
            - parameter: Ableton Live parameter; Live.DeviceParameter.DeviceParameter
@@ -203,26 +290,29 @@ class CCMap ( dict ) :
            - warning: function to call to write any warnings
         """
         # check CC map consistency
-        seen = []
         for cc_info in self.values():
+            # parameters can deliberately be left unmapped
+            if not cc_info.is_mapped():
+                continue
             channel = cc_info.get_midi_channel()
             if channel not in range(1,17):
                 warning(f'Bad MIDI channel {channel} in CC map.')
             cc_no = cc_info.get_cc_no()
             if cc_no not in range(0,128):
                 warning(f'Bad MIDI CC parameter {cc_no} in CC map.')
-            seeing = (channel, cc_no)
-            if seeing in seen:
-                warning(f'Duplicate {seeing} in CC map.')
-            else:
-                seen.append(seeing)
+        for (seeing,names) in self._cc_index.items():
+            if len(names) > 1:
+                warning(f'Duplicate {seeing} in CC map (for {names}).')
         # check parameter mappings
         device_parameters = make_device_parameters_unique(device)
         pnames = [p.original_name for p in device_parameters]
         ccnames = self.keys()
+        # (use sets to keep membership tests cheap)
+        pnames_set = set(pnames)
+        ccnames_set = set(ccnames)
         for name in pnames:
-            if not name in ccnames:
+            if not name in ccnames_set:
                 warning(f'Unmapped parameter {name} found for {device_name}!')
         for name in ccnames:
-            if not name in pnames:
+            if not name in pnames_set:
                 warning(f'Mapped parameter {name} does not exist for {device_name}!')
@@ -0,0 +1,176 @@
+# DeviceMetadata
+# - export the parameter metadata of a device to JSON (in Live), and
+#   reconstruct an offline device from it (outside Live, see PresetCompiler.py)
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+#
+# Note: this module does not depend on Live (nor do the modules it imports);
+# the metadata contains everything ElectraOneDumper needs to construct a
+# preset for the device.
+
+# Python imports
+import json
+import os
+
+# Local imports
+from .PresetInfo import write_if_changed
+
+try:
+    from _Generic.Devices import DEVICE_DICT
+except ImportError:
+    # running outside Live (see PresetCompiler.py)
+    DEVICE_DICT = {}
+
+# Version of the metadata format
+METADATA_VERSION = 1
+
+# Number of values (evenly spaced between min and max, inclusive) for which
+# the value string of a non quantized parameter is exported
+SAMPLE_COUNT = 5
+
+def _sample_key(value):
+    """Return the key under which the value string of a value is stored.
+       - value: the value; float
+       - result: ; str
+    """
+    return repr(float(value))
+
+def export_device_metadata(device, device_name):
+    """Return the metadata of a device: its name and, for every parameter,
+       its names, range, quantization, value items and the value strings
+       (as returned by str_for_value) for some values in its range.
+       - device: the device; Live.Device.Device
+       - device_name: name of the device (see LiveBase.get_device_name); str
+       - result: the metadata; dict
+    """
+    parameters = []
+    for p in device.parameters:
+        if p.is_quantized:
+            values = (p.min, p.max)
+        else:
+            step = (p.max - p.min) / (SAMPLE_COUNT - 1)
+            values = [p.min + i * step for i in range(SAMPLE_COUNT - 1)] + [p.max]
+        samples = { _sample_key(v): p.str_for_value(v) for v in values }
+        parameters.append({ 'name': p.name
+                          , 'original_name': p.original_name
+                          , 'min': p.min
+                          , 'max': p.max
+                          , 'is_quantized': p.is_quantized
+                          , 'value_items': [str(item) for item in p.value_items] if p.is_quantized else []
+                          , 'samples': samples
+                          })
+    banks = DEVICE_DICT.get(device_name)
+    return { 'version': METADATA_VERSION
+           , 'device_name': device_name
+           , 'name': device.name
+           , 'class_name': device.class_name
+           , 'can_have_chains': device.can_have_chains
+           , 'banks': [list(bank) for bank in banks] if banks else None
+           , 'parameters': parameters
+           }
+
+def write_device_metadata(device, device_name, path, debug):
+    """Export the metadata of a device to <path>/<devicename>.json
+       (unless the file already contains this metadata)
+       - device: the device; Live.Device.Device
+       - device_name: name of the device; str
+       - path: folder to write the metadata to; Path
+       - debug: function to log debugging info
+    """
+    debug(2,f'Exporting metadata of device: { device_name } in { path }.')
+    metadata = export_device_metadata(device, device_name)
+    os.makedirs(path, exist_ok=True)
+    contents = json.dumps(metadata,indent=1).encode('utf-8')
+    if not write_if_changed(f'{ path }/{ device_name }.json', contents):
+        debug(3,'Metadata unchanged.')
+
+class OfflineParameter:
+    """Device parameter reconstructed from exported metadata (stand in
+       for Live.DeviceParameter.DeviceParameter)
+    """
+
+    def __init__(self, entry):
+        """Create a parameter from its metadata.
+           - entry: metadata of the parameter (see export_device_metadata); dict
+        """
+        self.name = entry['name']
+        self.original_name = entry['original_name']
+        self.min = entry['min']
+        self.max = entry['max']
+        self.value = self.min
+        self.is_quantized = entry['is_quantized']
+        self.value_items = tuple(entry['value_items'])
+        self._samples = entry['samples']
+
+    def str_for_value(self, value):
+        """Return the value string for a value: the exported one if
+           available, else that of the nearest value that was exported.
+           - value: the value; float
+           - result: ; str
+        """
+        key = _sample_key(value)
+        if key in self._samples:
+            return self._samples[key]
+        nearest = min(self._samples, key=lambda k: abs(float(k) - value))
+        return self._samples[nearest]
+
+class OfflineDevice:
+    """Device reconstructed from exported metadata (stand in for
+       Live.Device.Device, providing what ElectraOneDumper and
+       UniqueParameters need)
+    """
+
+    def __init__(self, metadata):
+        """Create a device from its metadata.
+           - metadata: the metadata (see export_device_metadata); dict
+        """
+        assert metadata['version'] == METADATA_VERSION, f'Unsupported metadata version {metadata["version"]}.'
+        self.device_name = metadata['device_name']
+        self.name = metadata['name']
+        self.class_name = metadata['class_name']
+        self.can_have_chains = metadata['can_have_chains']
+        self.banks = metadata['banks']
+        self._live_ptr = id(self)
+        self._parameters = metadata['parameters']
+
+    @property
+    def parameters(self):
+        # like Live, return new parameter objects on every access
+        return [OfflineParameter(entry) for entry in self._parameters]
+
+    def add_parameters_listener(self, listener):
+        pass
+
+    def parameters_has_listener(self, listener):
+        return False
+
+    def remove_parameters_listener(self, listener):
+        pass
+
+def load_device_metadata(fname):
+    """Load exported metadata, and reconstruct the device from it.
+       - fname: file to load; str
+       - result: the device; OfflineDevice
+    """
+    with open(fname,'r') as f:
+        return OfflineDevice(json.load(f))
+
+class OfflineInstance:
+    """Stand in for the c_instance object passed by Live, for running
+       ElectraOneDumper outside Live: log messages are collected.
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def log_message(self, m):
+        self.messages.append(m)
+
+    def show_message(self, m):
+        pass
@@ -10,12 +10,14 @@
 
 # Python imports
 import os
+import sys
 import unicodedata
 
 # Local imports
 from .config import *
 from .ElectraOneBase import ElectraOneBase
 from .PresetInfo import PresetInfo
+from .PresetArchive import PresetArchive, minify_preset
 from .CCInfo import CCMap
 
 class Devices(ElectraOneBase):
@@ -33,6 +35,11 @@ class Devices(ElectraOneBase):
     #   names with their corresponding MIDI CCInfo values (as ordinary tuples)
     #   in the preset. The CCInfo data must match the info in the preset used for
     #   the same parameter.
+    #
+    # Presets are loaded from the archive preloaded.e1pa if it exists (see
+    # PresetArchive.py), and from the preloaded folder otherwise. Presets in
+    # the archive are only loaded when first requested; until then their
+    # entry contains None instead of the PresetInfo.
 
     def __init__(self,c_instance):
         """Load the predefined presets from file and store their data
@@ -47,15 +54,41 @@ class Devices(ElectraOneBase):
             self._default_lua_script = inf.read()
         # Dictionary of device presets in preloaded to dump (see above for structure)
         self._DEVICES = {}
-        assert os.path.exists(self.preloadedpath()), f'Error: Folder {self.preloadedpath()} does not exist.'
-        self.debug(2,f'Scanning {self.preloadedpath()} for presets.')
-        preset_paths = self.preloadedpath().glob('*.epr')
-        # process each preset path and store in DEVICES
-        count = 0 # preset_paths is a generator so len() does not work
-        for preset_path in preset_paths:
-            self._process_preset(preset_path)
-            count += 1
+        # Archive containing all predefined presets; None if presets are
+        # loaded from the preloaded folder instead
+        self._archive = None
+        if os.path.exists(self.preloadedarchivefname()):
+            self.debug(2,f'Opening preset archive {self.preloadedarchivefname()}.')
+            self._archive = PresetArchive(self.preloadedarchivefname())
+            # register each preset in the archive; presets are only sliced
+            # out of the archive when requested
+            count = 0
+            for name in self._archive.names():
+                if name.endswith('.epr'):
+                    self._register_preset(name[:-len('.epr')],None)
+                    count += 1
+        else:
+            assert os.path.exists(self.preloadedpath()), f'Error: Folder {self.preloadedpath()} does not exist.'
+            self.debug(2,f'Scanning {self.preloadedpath()} for presets.')
+            preset_paths = self.preloadedpath().glob('*.epr')
+            # process each preset path and store in DEVICES
+            count = 0 # preset_paths is a generator so len() does not work
+            for preset_path in preset_paths:
+                self._process_preset(preset_path)
+                count += 1
         self.debug(1,f'{count} presets predefined.')
+        # State to detect changes to the preloaded folder (see update_display)
+        # - modification time of the folder itself
+        self._preloaded_mtime = None
+        # - modification times of the preset files in it; { filename: mtime }
+        self._preloaded_file_mtimes = {}
+        # - (file system) names of presets that still need to be reloaded
+        self._pending_reloads = []
+        # functions to call when a predefined preset is reloaded
+        self._preset_reloaded_listeners = []
+        if (not self._archive) and (PRESET_RELOAD_PERIOD > 0):
+            self._preloaded_mtime = os.stat(self.preloadedpath()).st_mtime
+            self._preloaded_file_mtimes = self._scan_preloaded_file_mtimes()
 
     def _extract_version_from_name(self,device_versioned_name):
         """Extract the canonical device name and the version information from
@@ -69,6 +102,38 @@ class Devices(ElectraOneBase):
         splits = extended_name.rsplit('.')
         return (splits[0] , (int(splits[1]),int(splits[2]),int(splits[3])))
 
+    def _register_preset(self,device_versioned_name,preset_info):
+        """Store the preset info for a preset in DEVICES
+           - device_versioned_name: name of the preset; str
+           - preset_info: the preset info, or None if it must be loaded
+             (from the archive) when requested; PresetInfo
+        """
+        (device_name,version) = self._extract_version_from_name(device_versioned_name)
+        # create new dictionary entry if necessary
+        if device_name not in self._DEVICES:
+            self._DEVICES[device_name] = {}
+        self.debug(5,f'Predefining {device_name} ({device_versioned_name}) for Live version {version} or higher.')
+        self._DEVICES[device_name][version] = (device_versioned_name,preset_info)
+
+    def _make_preset_info(self,device_versioned_name,json_preset,lua_script,ccmap_str):
+        """Create the preset info from the contents of the preset files
+           (minifying the preset if MINIFY_PRESETS)
+           - device_versioned_name: name of the preset; str
+           - json_preset: contents of the .epr; str
+           - lua_script: contents of the .lua, or None if absent; str
+           - ccmap_str: contents of the .ccmap; str
+           - result: preset info; PresetInfo
+        """
+        if lua_script == None:
+            lua_script = ""
+        if MINIFY_PRESETS:
+            size = len(json_preset)
+            json_preset = minify_preset(json_preset)
+            self.debug(5,f'Preset {device_versioned_name} minified from {size} to {len(json_preset)} characters.')
+        # create a ccmap from the string 
+        ccmap = CCMap(ccmap_str)
+        return PresetInfo(json_preset,lua_script,ccmap,COMPRESS_PRESETS)
+    
     def _process_preset(self,preset_path):
         """Process one preset, storing its data in DEVICES
            - preset_path: path to .epr file containing JSON preset
@@ -84,27 +149,121 @@ class Devices(ElectraOneBase):
         # device names
         # (https://stackoverflow.com/questions/9757843/unicode-encoding-for-filesystem-in-mac-os-x-not-correct-in-python)
         device_versioned_name = unicodedata.normalize('NFC',str(device_versioned_name))
-        (device_name,version) = self._extract_version_from_name(device_versioned_name)
-        # create new dictionary entry if necessary
-        if device_name not in self._DEVICES:
-            self._DEVICES[device_name] = {}
-        self.debug(5,f'Predefining {device_name} ({device_versioned_name}) for Live version {version} or higher.')
         # load and process the .epr preset
         with open(json_preset_path,'r') as inf:
             json_preset = inf.read()
         # load the .lua script if it exist
-        lua_script = ""
-        # append the .lua if it exists
+        lua_script = None
         if os.path.exists(lua_script_path):
             with open(lua_script_path,'r') as inf:
-                lua_script += inf.read()
+                lua_script = inf.read()
         # load the .ccmap
         with open(ccmap_path,'r') as inf:
             ccmap_str = inf.read()
-        # create a ccmap from the string 
-        ccmap = CCMap(ccmap_str)
-        preset_info = PresetInfo(json_preset,lua_script,ccmap)
-        self._DEVICES[device_name][version] = (device_versioned_name,preset_info)
+        preset_info = self._make_preset_info(device_versioned_name,json_preset,lua_script,ccmap_str)
+        self._register_preset(device_versioned_name,preset_info)
+
+    def _load_archived_preset(self,device_versioned_name):
+        """Slice the preset, LUA script and CC map for a preset out of the
+           archive.
+           - device_versioned_name: name of the preset; str
+           - result: preset info; PresetInfo
+        """
+        self.debug(5,f'Loading {device_versioned_name} from archive.')
+        json_preset = self._archive.read(device_versioned_name + '.epr')
+        lua_script = self._archive.read(device_versioned_name + '.lua')
+        ccmap_str = self._archive.read(device_versioned_name + '.ccmap')
+        assert ccmap_str != None, f'Error: no CC map archived for {device_versioned_name}.'
+        return self._make_preset_info(device_versioned_name,json_preset,lua_script,ccmap_str)
+
+    # --- reloading presets when the preloaded folder changes
+
+    def _scan_preloaded_file_mtimes(self):
+        """Return the modification times of all preset files in the
+           preloaded folder.
+           - result: dictionary of file names and modification times; { str: float}
+        """
+        mtimes = {}
+        with os.scandir(self.preloadedpath()) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1] in ('.epr','.lua','.ccmap'):
+                    mtimes[entry.name] = entry.stat().st_mtime
+        return mtimes
+
+    def _check_preloaded_changes(self):
+        """Check whether the preloaded folder changed (only looking at the
+           modification time of the folder itself), and if so determine
+           which presets changed and schedule them for reloading.
+        """
+        mtime = os.stat(self.preloadedpath()).st_mtime
+        if mtime == self._preloaded_mtime:
+            return
+        self.debug(2,'Change in preloaded folder detected.')
+        self._preloaded_mtime = mtime
+        file_mtimes = self._scan_preloaded_file_mtimes()
+        old_file_mtimes = self._preloaded_file_mtimes
+        self._preloaded_file_mtimes = file_mtimes
+        changed = { fname for fname in file_mtimes
+                    if file_mtimes[fname] != old_file_mtimes.get(fname) }
+        changed |= { fname for fname in old_file_mtimes
+                     if fname not in file_mtimes }
+        for fname in changed:
+            stem = os.path.splitext(fname)[0]
+            if stem not in self._pending_reloads:
+                self._pending_reloads.append(stem)
+
+    def _reload_preset(self,stem):
+        """Reload (or remove) a predefined preset after its files changed,
+           and inform any listeners.
+           - stem: file name of the preset without suffix; str
+        """
+        preset_path = self.preloadedpath() / (stem + '.epr')
+        device_versioned_name = unicodedata.normalize('NFC',stem)
+        try:
+            (device_name,version) = self._extract_version_from_name(device_versioned_name)
+        except ValueError:
+            # not a (versioned) preset name, e.g. Reverb.old.epr or a
+            # temporary file written by an editor
+            self.warning(f'Ignoring {stem} in preloaded folder: not a valid preset name.')
+            return
+        if os.path.exists(preset_path):
+            self.debug(1,f'Reloading predefined preset {device_versioned_name}.')
+            try:
+                self._process_preset(preset_path)
+            except:
+                # e.g. a CC map that is still being written
+                self.warning(f'Reloading preset {device_versioned_name} failed: {sys.exc_info()[1]}')
+                return
+        elif (device_name in self._DEVICES) and \
+             (version in self._DEVICES[device_name]):
+            self.debug(1,f'Removing predefined preset {device_versioned_name}.')
+            del self._DEVICES[device_name][version]
+            if len(self._DEVICES[device_name]) == 0:
+                del self._DEVICES[device_name]
+        else:
+            return
+        for listener in self._preset_reloaded_listeners:
+            listener(device_name)
+
+    def add_preset_reloaded_listener(self,listener):
+        """Register a function to call when a predefined preset for a
+           device is reloaded (or removed).
+           - listener: function(device_name)
+        """
+        self._preset_reloaded_listeners.append(listener)
+
+    def update_display(self,tick):
+        """Called every 100 ms. Every PRESET_RELOAD_PERIOD ticks, check whether
+           the preloaded folder changed; reload changed presets one per tick.
+           (Only when presets are loaded from the preloaded folder.)
+           - tick: number of 100ms ticks since start (mod 1000)
+        """
+        if self._preloaded_mtime == None:
+            return
+        if len(self._pending_reloads) > 0:
+            self._reload_preset(self._pending_reloads.pop(0))
+        elif (tick % PRESET_RELOAD_PERIOD) == 0:
+            self._check_preloaded_changes()
 
     # --- interface functions
         
@@ -134,7 +293,12 @@ class Devices(ElectraOneBase):
             for version in versions:
                 if (closest < version) and (version <= ElectraOneBase.LIVE_VERSION):
                     closest = version
-            return presets[closest]
+            (versioned_name,preset_info) = presets[closest]
+            # presets in the archive are loaded on first use
+            if preset_info == None:
+                preset_info = self._load_archived_preset(versioned_name)
+                presets[closest] = (versioned_name,preset_info)
+            return (versioned_name,preset_info)
         else:
             return (None,None)
 
@@ -30,6 +30,14 @@ E1_SYSEX_PRESET_LIST_CHANGE = (0x7E, 0x05)
 # (User-defined in effect patch LUA script, see DEFAULT_LUASCRIPT in EffectController.py)
 E1_SYSEX_PATCH_REQUEST_PRESSED = (0x7E, 0x7E) # no data
 
+# SysEx incomming command when the page shown on the E1 changes
+# (User-defined in the default LUA script, see default.lua)
+E1_SYSEX_PAGE_CHANGED = (0x7E, 0x7D) # followed by the page number
+
+# SysEx incomming command requesting a batch dump of all devices
+# (User-defined in the default LUA script, see default.lua)
+E1_SYSEX_BATCH_DUMP_REQUEST = (0x7E, 0x7C) # no data
+
 # --- General
 
 def hexify(midimsg):
@@ -16,7 +16,12 @@ from .CCInfo import CCInfo
 from .PresetInfo import PresetInfo
 from .ElectraOneBase import ElectraOneBase 
 from .ElectraOneDumper import ElectraOneDumper
+from .PresetCache import PresetCache
+from .DeviceMetadata import write_device_metadata
+from .UniqueParameters import device_parameters_fingerprint, make_device_parameters_unique
+from .ElectraOneDumper import truncate_parameter_name, MORE_PAGE_ID
 from .GenericDeviceController import GenericDeviceController
+from .RefreshJob import RefreshJob
 
 # Note: the EffectController creates an instance of a GenericDeviceController
 # to manage the currently assigned device. If uploading is delayed,
@@ -28,6 +33,9 @@ from .GenericDeviceController import GenericDeviceController
 # the now deleted device). If no device is assigned, then self._assigned_device
 # equal None 
 
+# Name of the preset template shared by racks (see USE_RACK_TEMPLATES)
+RACK_TEMPLATE_NAME = 'Rack'
+
 class EffectController(ElectraOneBase):
     """Control the currently selected device.
     """
@@ -53,10 +61,35 @@ class EffectController(ElectraOneBase):
         self._assigned_device_upload_delayed = True
         # record if device is locked
         self._assigned_device_locked = False
+        # group of pages of the assigned device currently uploaded, and the
+        # number of groups (see USE_PAGE_GROUPS)
+        self._assigned_group = 0
+        self._assigned_group_count = 1
+        # full refresh of the assigned device in progress (if not None)
+        self._refresh_job = None
+        # presets constructed on the fly
+        self._preset_cache = PresetCache(c_instance)
+        # presets whose CC map has been validated (this session), as
+        # (versioned device name, device parameters fingerprint) pairs
+        self._validated_presets = set()
+        # devices whose metadata was exported (see EXPORT_DEVICE_METADATA),
+        # as (device name, fingerprint of its parameters)
+        self._exported_devices = set()
+        # fingerprint of the rack template currently uploaded to the
+        # effect preset slot (None if the slot holds another preset)
+        self._uploaded_template = None
+        # labels to set for the controls of a rack template after each
+        # full refresh; { control id: label }
+        self._template_labels = {}
+        # page of the effect preset currently visible on the E1 (kept when
+        # an uploaded template is reused for another rack)
+        self._visible_page = 1
         # listen to device appointment changes (the actual changes are
         # created by DeviceAppointer or by other remote scripts handling device
         # appointments)
         self.song().add_appointed_device_listener(self._handle_appointed_device_change)
+        # listen to changes to predefined presets
+        self._devices.add_preset_reloaded_listener(self._handle_preset_reloaded)
         self.debug(0,'EffectController loaded.')
 
     # --- functions to check state ---
@@ -95,12 +128,60 @@ class EffectController(ElectraOneBase):
         """
         if self._assigned_device_is_visible():
             self.debug(1,'EffCont refreshing state.')
-            self.midi_burst_on()
-            self._assigned_device_controller.refresh_state()
-            self.midi_burst_off()
-            self.debug(1,'EffCont state refreshed.')
+            # a new refresh supersedes the one in progress
+            self._cancel_refresh()
+            self._refresh_job = RefreshJob('effect', self._refresh_steps(), self.debug)
+            self._continue_refresh()
         else:
             self.debug(1,'EffCont not refreshing state (no effect selected or visible).')
+
+    def _refresh_steps(self):
+        """Generator performing a state refresh in steps (see RefreshJob)
+        """
+        try:
+            if self._template_labels:
+                self.send_control_labels(self._template_labels)
+                yield
+            yield from self._assigned_device_controller.refresh_state_steps()
+        finally:
+            self.debug(1,'EffCont state refreshed.')
+        
+    def _continue_refresh(self):
+        """Continue the refresh in progress (if any) within the time budget.
+           Burst mode is on only while the job runs, without waiting for
+           the E1 (so the main thread is not blocked).
+        """
+        if self._refresh_job:
+            self.midi_burst_on(wait=False)
+            try:
+                finished = self._refresh_job.run(REFRESH_TIME_BUDGET)
+            finally:
+                self.midi_burst_off(wait=False)
+            if finished:
+                self._refresh_job = None
+
+    def _cancel_refresh(self):
+        """Cancel the refresh in progress (if any).
+        """
+        if self._refresh_job:
+            self._refresh_job.cancel()
+            self._refresh_job = None
+            
+    def set_visible_page(self, page):
+        """Record the page of the effect preset currently visible on the E1,
+           and immediately refresh it if it was not refreshed yet.
+           If the device is split into groups of pages, selecting the last
+           page uploads the preset for the next group.
+           - page: the page id; int
+        """
+        self._visible_page = page
+        if self._assigned_device_is_visible():
+            if (self._assigned_group_count > 1) and (page == MORE_PAGE_ID):
+                self._assigned_group = (self._assigned_group + 1) % self._assigned_group_count
+                self.debug(1,f'Moving to group {self._assigned_group+1} of {self._assigned_group_count}.')
+                self._upload_device(self._assigned_device)
+            else:
+                self._assigned_device_controller.set_visible_page(page)
             
     def update_display(self,tick):
         """Called every 100 ms; used to update values of controls whose
@@ -115,8 +196,13 @@ class EffectController(ElectraOneBase):
                 self.debug(1,'Delayed device upload detected.')
                 self._upload_device(self._assigned_device)
                 self._assigned_device_upload_delayed = False
-        # Update the display after the refresh period
-        if self._assigned_device_is_visible() and ((tick % EFFECT_REFRESH_PERIOD) == 0):
+        # Continue a full refresh in progress; update the display only when done
+        if self._refresh_job:
+            if self._assigned_device_is_visible():
+                self._continue_refresh()
+            else:
+                self._cancel_refresh()
+        elif self._assigned_device_is_visible() and ((tick % EFFECT_REFRESH_PERIOD) == 0):
             self.debug(6,'EffCont updating display.')
             self._assigned_device_controller.update_display()
             self.debug(6,'EffCont display updated.')
@@ -126,6 +212,7 @@ class EffectController(ElectraOneBase):
         """
         self.debug(1,'EffCont disconnecting.')
         self.remove_preset_from_slot(EFFECT_PRESET_SLOT)
+        self._disconnect_device_controller()
         self.song().remove_appointed_device_listener(self._handle_appointed_device_change)
 
     def select(self):
@@ -156,33 +243,113 @@ class EffectController(ElectraOneBase):
         
     # === Others ===
 
-    def _get_preset_info(self, device):
+    def _uses_rack_template(self, device, device_name):
+        """Return whether the device shares the preset template for racks
+           (instead of getting a preset of its own constructed on the fly).
+           Not for racks whose name is used in the configuration, as such
+           configuration would then apply to all racks sharing the template.
+           - device: the device; Live.Device.Device
+           - device_name: name of the device; str
+           - result: bool
+        """
+        return USE_RACK_TEMPLATES and device.can_have_chains and \
+            (device_name not in PARAMETERS_TO_IGNORE) and \
+            (device_name not in PERSONAL_DEVICE_DICT) and \
+            (device_name not in BORKED_DEVICES)
+    
+    def _get_preset_info(self, device, group):
         """Get the preset info for the specified device, either predefined or
-           else construct it on the fly.
+           else construct it on the fly (or take it from the cache of presets
+           constructed on the fly earlier, see PresetCache). Racks without
+           a predefined preset share a template (see USE_RACK_TEMPLATES).
            If DUMP=True, construct the preset on the fly, and dump it.
+           If EXPORT_DEVICE_METADATA=True, export the device metadata.
            - device: device to get preset for; Live.Device.Device (!= None)
-           - return (versioned_device_name,preset_info)
+           - group: group of pages to get the preset for, for devices with
+             more parameters than fit in a preset (see USE_PAGE_GROUPS); int
+           - return (versioned_device_name,preset_info,template)
            where versioned_device_name is the version specific name of the
-           device (e.g Echo.12.0) when a Live specific version preset is found
+           device (e.g Echo.12.0) when a Live specific version preset is found,
+           and template is the fingerprint of the template used (None if the
+           preset is not a template)
         """
         device_name = self.get_device_name(device)
         self.debug(3,f'Getting preset for { device_name }.')
+        # (a full pass over the device parameters: compute it only once)
+        parameters_fingerprint = device_parameters_fingerprint(device)
+        if EXPORT_DEVICE_METADATA:
+            # export once per session (unless the device parameters change)
+            export_key = (device_name, parameters_fingerprint)
+            if export_key not in self._exported_devices:
+                write_device_metadata(device, device_name, self.metadatapath(), self.debug)
+                self._exported_devices.add(export_key)
         (versioned_device_name,preset_info) = self._devices.get_predefined_preset_info(device_name)
+        template = None
         if preset_info:
             self.debug(3,f'Predefined preset {versioned_device_name} found')
-        if (not preset_info or DUMP):
-            # construct a preset on the fly if none found or DUMP requested
+            self.debug(4,f'Preset cache: { PresetInfo.cache_stats() }')
+        if DUMP:
+            # construct a preset on the fly and dump it if DUMP requested
             self.debug(3,'Constructing preset on the fly...')
-            dumper = ElectraOneDumper(self.get_c_instance(), device)
+            dumper = ElectraOneDumper(self.get_c_instance(), device, group=group)
             dump_preset_info = dumper.get_preset_info()
-        if DUMP:
-            dump_preset_info.dump(device, device_name, self.dumppath(), self.debug)
-        if not preset_info:
+            # (named like uploaded presets for groups, so groups do not
+            # overwrite each other's dump)
+            dump_name = device_name if group == 0 else f'{device_name}-{group+1}'
+            dump_preset_info.dump(device, dump_name, self.dumppath(), self.debug)
+            if not preset_info:
+                versioned_device_name = dump_name
+                preset_info = dump_preset_info
+        elif not preset_info and self._uses_rack_template(device, device_name):
+            # use the template for this layout of macros
+            versioned_device_name = RACK_TEMPLATE_NAME
+            (preset_info,template) = self._preset_cache.get(device, RACK_TEMPLATE_NAME, False)
+            if preset_info:
+                self.debug(3,'Cached rack template found.')
+            else:
+                self.debug(3,'Constructing rack template...')
+                dumper = ElectraOneDumper(self.get_c_instance(), device, RACK_TEMPLATE_NAME)
+                preset_info = dumper.get_preset_info()
+                self._preset_cache.put(template, preset_info)
+        elif not preset_info:
+            # use the preset constructed on the fly earlier, if cached
             versioned_device_name = device_name
-            preset_info = dump_preset_info
-        # check preset integrity; any warnings will be reported in the log
-        preset_info.validate(device, device_name, self.warning)
-        return (versioned_device_name,preset_info)
+            (preset_info,fingerprint) = self._preset_cache.get(device, device_name, group=group, parameters_fingerprint=parameters_fingerprint)
+            if preset_info:
+                self.debug(3,'Cached preset found.')
+            else:
+                self.debug(3,'Constructing preset on the fly...')
+                dumper = ElectraOneDumper(self.get_c_instance(), device, group=group)
+                preset_info = dumper.get_preset_info()
+                self._preset_cache.put(fingerprint, preset_info)
+            if group > 0:
+                # (to not load a preloaded preset for the first group on the E1)
+                versioned_device_name = f'{device_name}-{group+1}'
+        # check preset integrity (once, unless the device parameters
+        # change); any warnings will be reported in the log
+        validation_key = (versioned_device_name, parameters_fingerprint)
+        if validation_key not in self._validated_presets:
+            preset_info.validate(device, device_name, self.warning)
+            self._validated_presets.add(validation_key)
+        return (versioned_device_name,preset_info,template)
+
+    def _get_template_labels(self, device, preset_info):
+        """Return the labels to set for the controls of a template: the
+           names of the parameters of the device mapped to them.
+           - device: the device; Live.Device.Device
+           - preset_info: the template; PresetInfo
+           - result: dictionary mapping control ids to labels; { int: str }
+        """
+        cc_map = preset_info.get_cc_map()
+        cc_controls = preset_info.get_cc_controls()
+        labels = {}
+        for p in make_device_parameters_unique(device):
+            cc_info = cc_map.get_cc_info(p)
+            if cc_info.is_mapped():
+                cc = (cc_info.get_midi_channel(), cc_info.get_cc_no())
+                if cc in cc_controls:
+                    labels[cc_controls[cc]] = truncate_parameter_name(p.name)
+        return labels
 
     # --- handle device selection ---
     
@@ -196,6 +363,14 @@ class EffectController(ElectraOneBase):
             self._assigned_device_locked = False
             self._assign_device(self.song().appointed_device)
 
+    def _disconnect_device_controller(self):
+        """Disconnect and remove the controller of the assigned device (if any).
+        """
+        self._cancel_refresh()
+        if self._assigned_device_controller:
+            self._assigned_device_controller.disconnect()
+            self._assigned_device_controller = None
+        
     def _upload_device(self,device):
         """Upload the currently assigned device to the effect preset slot on
            the E1 and create a device controller for it.
@@ -203,19 +378,43 @@ class EffectController(ElectraOneBase):
         """
         # upload an empty preset if None (eg when track deleted and no device appointed)
         if device:
-            (versioned_device_name,preset_info) = self._get_preset_info(device)
-            self.debug(1,f'Uploading device { versioned_device_name }.')
+            (versioned_device_name,preset_info,template) = self._get_preset_info(device, self._assigned_group)
+            self._assigned_group_count = preset_info.get_group_count()
             cc_map = preset_info.get_cc_map()
-            self._assigned_device_controller = GenericDeviceController(self._c_instance, device, cc_map)
+            self._disconnect_device_controller()
+            self._assigned_device_controller = GenericDeviceController(self._c_instance, device, cc_map, preset_info.get_control_pages(), preset_info.get_cc_pages())
+            if template:
+                self._template_labels = self._get_template_labels(device, preset_info)
+            else:
+                self._template_labels = {}
+            if template and (template == self._uploaded_template) and \
+               ElectraOneBase.preset_upload_successful:
+                # the template is already in the effect preset slot: only
+                # the MIDI map needs rebuilding (which will also refresh
+                # state, and set the labels)
+                self.debug(1,f'Reusing uploaded template for device { self.get_device_name(device) }.')
+                # the E1 still shows the page of the template that was visible
+                self._assigned_device_controller.set_visible_page(self._visible_page)
+                if not self._slot_is_visible():
+                    self.activate_preset_slot(EFFECT_PRESET_SLOT)
+                self.request_rebuild_midi_map()
+                return
+            self.debug(1,f'Uploading device { versioned_device_name }.')
             preset = preset_info.get_preset()
             # get the default lua script and append the preset specific lua script
             script = self._devices.get_default_lua_script()
             script += preset_info.get_lua_script()
         else:
             versioned_device_name = 'Empty'
-            self._assigned_device_controller = None
+            template = None
+            self._assigned_group_count = 1
+            self._template_labels = {}
+            self._disconnect_device_controller()
             preset = '{"version":2,"name":"Empty","projectId":"l49eJksr7QcPZuqbF2rv","pages":[],"groups":[],"devices":[],"overlays":[],"controls":[]}'
             script = self._devices.get_default_lua_script()
+        self._uploaded_template = template
+        # a newly uploaded preset shows its first page
+        self._visible_page = 1
         # upload preset: will also request midi map (which will also refresh state)
         # use versioned_device_name to (try to) look up correct preloaded preset on the E1
         self.upload_preset(EFFECT_PRESET_SLOT,versioned_device_name,preset,script)
@@ -229,7 +428,8 @@ class EffectController(ElectraOneBase):
            - device: device to assign; Live.Device.Device
         """
         self._assigned_device = device
-        self._assigned_device_controller = None
+        self._assigned_group = 0
+        self._disconnect_device_controller()
         # upload preset if possible and needed: will also request midi map
         # (which will also refresh state)
         if self.is_ready() and \
@@ -242,6 +442,18 @@ class EffectController(ElectraOneBase):
             self.debug(1,'Device upload delayed.')
             self._assigned_device_upload_delayed = True
 
+    def _handle_preset_reloaded(self, device_name):
+        """Handle a change to the predefined preset of a device: upload it
+           again if it belongs to the currently assigned device.
+           - device_name: name of the device whose preset changed; str
+        """
+        # the changed preset must be validated again
+        self._validated_presets.clear()
+        if self._assigned_device and \
+           (self.get_device_name(self._assigned_device) == device_name):
+            self.debug(0,f'Predefined preset for assigned device {device_name} changed.')
+            self._assign_device(self._assigned_device)
+
     def _handle_appointed_device_change(self):
         """Handle an appointed device change: change the currently assigned
            device unless it is locked.
@@ -17,12 +17,13 @@ import time
 import sys
 
 # Local imports
-from .E1Midi import parse_cc, is_cc, parse_E1_sysex, is_E1_sysex, hexify, E1_SYSEX_LOGMESSAGE, E1_SYSEX_PRESET_CHANGED, E1_SYSEX_ACK, E1_SYSEX_NACK, E1_SYSEX_REQUEST_RESPONSE, E1_SYSEX_PATCH_REQUEST_PRESSED, E1_SYSEX_PRESET_LIST_CHANGE 
+from .E1Midi import parse_cc, is_cc, parse_E1_sysex, is_E1_sysex, hexify, E1_SYSEX_LOGMESSAGE, E1_SYSEX_PRESET_CHANGED, E1_SYSEX_ACK, E1_SYSEX_NACK, E1_SYSEX_REQUEST_RESPONSE, E1_SYSEX_PATCH_REQUEST_PRESSED, E1_SYSEX_PRESET_LIST_CHANGE, E1_SYSEX_PAGE_CHANGED, E1_SYSEX_BATCH_DUMP_REQUEST
 from .ElectraOneBase import ElectraOneBase, ACK_RECEIVED, NACK_RECEIVED
 from .EffectController import EffectController
 from .MixerController import MixerController
 from .DeviceAppointer import DeviceAppointer
 from .Devices import Devices
+from .BatchDumper import BatchDumper
 from .config import *
 from .versioninfo import COMMITDATE
 
@@ -65,6 +66,9 @@ class ElectraOne(ElectraOneBase):
         # (We do this here because at this point in time the remote script
         # gets more resources to initialise, apparently.)
         self.devices = Devices(c_instance)
+        # dumps the presets for all devices on request (see BATCH_DUMP)
+        self._batch_dumper = BatchDumper(c_instance)
+        self._batch_dump_pending = BATCH_DUMP
         # 'close' the interface until E1 detected.
         ElectraOneBase.E1_connected = False # do this outside thread because
         # thread may not even execute first statement before finishing
@@ -295,6 +299,18 @@ class ElectraOne(ElectraOneBase):
         else:
             self.debug(1,'Preset changed ignored because E1 not ready or CONTROL_MODE != CONTROL_EITHER.') 
 
+    def _do_page_changed(self, page_data):
+        """Handle a page changed message (sent by the default LUA script
+           included in all effect presets).
+           - page_data: incoming MIDI SysEx data; sequence of 1 byte
+        """
+        assert len(page_data) == 1, f'Wrong data {page_data} in page changed message.'
+        page = page_data[0]
+        self.debug(2,f'Page {page} selected on the E1')
+        if (ElectraOneBase.current_visible_slot == EFFECT_PRESET_SLOT) and \
+           self._effect_controller:
+            self._effect_controller.set_visible_page(page)
+
     def _do_sysex_patch_request_pressed(self):
         """Handle a patch request pressed message: swap the visible preset
            - midimsg: incoming MIDI SysEx message; sequence of bytes
@@ -314,6 +330,13 @@ class ElectraOne(ElectraOneBase):
         else:
             self.debug(1,'Patch request ignored because E1 not ready or CONTROL_MODE != CONTROL_EITHER.')
         
+    def _do_batch_dump_request(self):
+        """Handle a batch dump request: dump the presets for all devices
+           in the song (once the E1 is ready)
+        """
+        self.debug(1,'Batch dump requested.')
+        self._batch_dump_pending = True
+
     def _process_midi_sysex(self, midimsg):
         """Process incoming MIDI SysEx message.
            - midimsg: incoming MIDI SysEx message; sequence of bytes
@@ -332,6 +355,10 @@ class ElectraOne(ElectraOneBase):
             self._do_logmessage(data)
         elif command == E1_SYSEX_PATCH_REQUEST_PRESSED:
             self._do_sysex_patch_request_pressed()
+        elif command == E1_SYSEX_PAGE_CHANGED:
+            self._do_page_changed(data)
+        elif command == E1_SYSEX_BATCH_DUMP_REQUEST:
+            self._do_batch_dump_request()
         elif command == E1_SYSEX_PRESET_LIST_CHANGE:
             pass # silently ignore this
         else:
@@ -404,6 +431,11 @@ class ElectraOne(ElectraOneBase):
                 self._refresh_state_pending = False
                 self.debug(0,'Pending refresh state detected.')
                 self.refresh_state()
+            self.devices.update_display(self._update_tick)
+            if self._batch_dump_pending:
+                self._batch_dump_pending = False
+                self._batch_dumper.start()
+            self._batch_dumper.update_display()
             if self._effect_controller:
                 self._effect_controller.update_display(self._update_tick)
             if self._mixer_controller:
@@ -423,6 +455,7 @@ class ElectraOne(ElectraOneBase):
         """Called right before we get disconnected from Live.
         """
         self.debug(0,'Main disconnect called.') 
+        self._batch_dumper.disconnect()
         if ElectraOneBase.E1_connected:
             if self._effect_controller:
                 self._effect_controller.disconnect()
@@ -15,7 +15,11 @@
 # Functions that start with a double underscore __ shoult only be
 # called within a thread.
 
-import Live
+try:
+    import Live
+except ImportError:
+    # running outside Live (see PresetCompiler.py)
+    Live = None
 
 # Python imports
 from pathlib import Path
@@ -80,6 +84,10 @@ class ElectraOneBase(LiveBase):
     # Global variables because there are different instances of ElectraOneBase!
     _send_midi_sleep = 0  
     _send_value_update_sleep = 0 
+
+    # number of (nested or overlapping) MIDI bursts in progress; burst mode
+    # is only switched off when the last one ends (see midi_burst_on/off)
+    _midi_burst_depth = 0
     
     # --- INIT
     
@@ -533,10 +541,17 @@ class ElectraOneBase(LiveBase):
         self._increment_acks_pending()
         self._send_midi_sysex(sysex_command, sysex_lua)
 
-    def midi_burst_on(self):
+    def midi_burst_on(self, wait=True):
         """Prepare the script for a burst of updates; set a small delay
            to prevent clogging the E1, and disable window repaints.
+           Bursts may be nested or overlap: only the first one switches
+           burst mode on.
+           - wait: whether to wait for the E1 to process the command (not
+             done by refresh jobs, that must not block the main thread); bool
         """
+        ElectraOneBase._midi_burst_depth += 1
+        if ElectraOneBase._midi_burst_depth > 1:
+            return
         self.debug(4,'MIDI burst on.')
         # TODO: set proper timings; note that the current HW has 256k RAM
         # so the buffers are only 32 entries for sysex, and 128 non-sysex
@@ -548,22 +563,32 @@ class ElectraOneBase(LiveBase):
         self._send_lua_command('aa()')
         # wait a bit to ensure the command is processed before sending actual
         # value updates (we cannot wait for the actual ACK)
-        time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP) 
+        if wait:
+            time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP) 
         
-    def midi_burst_off(self):
+    def midi_burst_off(self, wait=True):
         """Reset the delays, because updates are now individual. And allow
            immediate window updates again. Draw any buffered window repaints.
+           Only the last of nested or overlapping bursts switches burst
+           mode off.
+           - wait: whether to wait for the E1 to process the command; bool
         """
+        assert ElectraOneBase._midi_burst_depth > 0, 'MIDI burst off without burst on.'
+        ElectraOneBase._midi_burst_depth -= 1
+        if ElectraOneBase._midi_burst_depth > 0:
+            return
         self.debug(4,'MIDI burst off.')
         # wait a bit to ensure all MIDI CC messages have been processed
-        time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP) 
+        if wait:
+            time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP) 
         ElectraOneBase._send_midi_sleep = ElectraOneBase.MIDI_SLEEP
         ElectraOneBase._send_value_update_sleep = ElectraOneBase.VALUE_UPDATE_SLEEP
         # reenable drawing and update display
         self._send_lua_command('zz()')
         # wait a bit to ensure the command is processed
         # (we cannot wait for the actual ACK)
-        time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP)
+        if wait:
+            time.sleep(ElectraOneBase.BURST_ON_OFF_SLEEP)
 
     def update_track_labels(self, idx, label):
         """Update the label for a track on all relevant pages
@@ -771,6 +796,66 @@ class ElectraOneBase(LiveBase):
         self._send_midi_sysex(sysex_command, sysex_controlid + sysex_valueid + sysex_text)
         time.sleep(ElectraOneBase._send_value_update_sleep) # don't overwhelm the E1!
         
+    def send_value_updates(self, updates):
+        """Send value updates for several controls in the currently displayed
+           patch on the E1. If BATCH_VALUE_UPDATES, as few LUA commands as
+           possible are used (calling svb() defined in default.lua, that
+           must therefore be included in the preset); otherwise this sends a
+           value update for each control separately. (With firmware 3.7 and
+           later LUA commands are limited to SYSEX_LUA_COMMAND_MAX_LENGTH=80
+           characters, so only about 4-5 entries fit in one svb() command;
+           this reduces the number of messages roughly 5 times.)
+           - updates: dictionary mapping controls to the string representing
+             the value to display; { (cid,vid): str }
+        """
+        if not BATCH_VALUE_UPDATES:
+            for ((cid,vid),valuestr) in updates.items():
+                self.send_value_update(cid,vid,valuestr)
+            return
+        self.debug(4,f'Send batch of {len(updates)} value updates.')
+        strs = []
+        for ((cid,vid),valuestr) in updates.items():
+            assert cid in range(1,433), f'Control id {cid} out of range.' 
+            # escape the string for LUA
+            valuestr = valuestr.replace('\\','\\\\').replace('"','\\"')
+            entry = f'{cid},"{valuestr}"'
+            # svb() only handles the main value of a control; entries that
+            # would not fit a LUA command are sent individually
+            if (vid != 0) or \
+               ((ElectraOneBase.SYSEX_LUA_COMMAND_MAX_LENGTH >= 0) and \
+                (len(entry) > ElectraOneBase.SYSEX_LUA_COMMAND_MAX_LENGTH - len('svb({})') - 1)):
+                self.send_value_update(cid,vid,updates[(cid,vid)])
+            else:
+                strs.append(entry)
+        # join the entries, making sure the resulting strings do not
+        # exceed SYSEX_LUA_COMMAND_MAX_LENGTH when sent
+        chunks = self._join_lua_list_chunks(strs,'svb({})')
+        for chunk in chunks:
+            command = f'svb({{{chunk}}})' # {{ adds a {
+            self._send_lua_command(command)
+            time.sleep(ElectraOneBase._send_value_update_sleep) # don't overwhelm the E1!
+        
+    def send_control_labels(self, labels):
+        """Set the labels of several controls in the currently displayed
+           patch on the E1 (calling scl() defined in default.lua, that
+           must therefore be included in the preset).
+           - labels: dictionary mapping control ids to labels; { int: str }
+        """
+        self.debug(4,f'Send {len(labels)} control labels.')
+        strs = []
+        for (cid,label) in labels.items():
+            assert cid in range(1,433), f'Control id {cid} out of range.' 
+            # escape the string for LUA
+            label = label.replace('\\','\\\\').replace('"','\\"')
+            strs.append(f'{cid},"{label}"')
+        # join the entries, making sure the resulting strings do not
+        # exceed SYSEX_LUA_COMMAND_MAX_LENGTH when sent
+        chunks = self._join_lua_list_chunks(strs,'scl({})')
+        for chunk in chunks:
+            command = f'scl({{{chunk}}})' # {{ adds a {
+            self._send_lua_command(command)
+            time.sleep(ElectraOneBase._send_value_update_sleep) # don't overwhelm the E1!
+        
     def setup_logging(self):
         """Enable or disable logging on the E1 (based on E1_LOGGING)
            and set the port over which logging messages are sent (based on
@@ -904,12 +989,16 @@ class ElectraOneBase(LiveBase):
     def __upload_preset_to_current_slot(self, preset):
         """Upload the specified preset to the currently selected slot on
            the E1 (use __select_slot_only to select the desired slot)
-           - preset: preset to upload; str (JASON, .epr format)
+           - preset: preset to upload; str or bytes (ASCII) (JASON, .epr format)
         """
         self.debug(3,f'Uploading preset (size {len(preset)} bytes).')
         # see https://docs.electra.one/developers/midiimplementation.html#upload-a-preset
         sysex_command = (0x01, 0x01)
-        sysex_preset = self._ascii_bytes(preset)
+        if type(preset) is bytes:
+            # already ASCII (constructed by ElectraOneDumper)
+            sysex_preset = tuple(preset)
+        else:
+            sysex_preset = self._ascii_bytes(preset)
         if not DUMP: # no need to write this to the log if the same thing is dumped
             self.debug(6,f'Preset = { preset }')
         # this SysEx command repsonds with an ACK/NACK 
@@ -925,7 +1014,7 @@ class ElectraOneBase(LiveBase):
            midi map.
            - slot: slot to upload to; (bank: 0..5, preset: 0..1)
            - preset_name: name of the preset to load; str
-           - preset: preset to upload; str (JASON, .epr format)
+           - preset: preset to upload; str or bytes (ASCII) (JASON, .epr format)
            - luascript: LUA script to upload; str
         """
         # should anything happen inside this thread, make sure we write to debug
@@ -10,16 +10,22 @@
 # Distributed under the MIT License, see LICENSE
 
 # Python imports
-import io, random, string
+import json, os, random, string, sys
 
 # Ableton Live imports
-from _Generic.Devices import *
+try:
+    from _Generic.Devices import *
+except ImportError:
+    # running outside Live (see PresetCompiler.py), where the banks are
+    # taken from the exported device metadata instead
+    DEVICE_DICT = {}
 
 # Local imports
 from .config import *
 from .E1Midi import cc7_value_for_item_idx
 from .ElectraOneBase import ElectraOneBase
-from .CCInfo import CCInfo, CCMap, UNMAPPED_CC, UNMAPPED_ID, IS_CC7, IS_CC14
+from .LRUCache import LRUCache
+from .CCInfo import CCInfo, CCMap, UNMAPPED_CC, UNMAPPED_ID, UNMAPPED_CCINFO, IS_CC7, IS_CC14
 from .PresetInfo import PresetInfo
 from .UniqueParameters import make_device_parameters_unique
 
@@ -49,6 +55,9 @@ HEIGHT = 56
 XCOORDS = [20,187,354,521,688,855]
 YCOORDS = [28,118,208,298,388,478]
 
+# default color of a control on the E1 (omitted if COMPACT_PRESETS)
+DEFAULT_COLOR = 'FFFFFF'
+
 # maximum values in a preset
 MAX_NAME_LEN = 14
 MAX_DEVICE_ID = 16
@@ -58,6 +67,15 @@ MAX_OVERLAY_ID = 51
 MAX_CONTROLSET_ID = CONTROLSETS_PER_PAGE
 MAX_POT_ID = (PARAMETERS_PER_PAGE // CONTROLSETS_PER_PAGE)
 
+# Devices with more parameters than fit a preset are split into groups (if
+# USE_PAGE_GROUPS). The preset for a group contains the parameters of that
+# group, and a last page (with a single control) that, when selected, moves
+# to the next group
+PAGES_PER_GROUP = MAX_PAGE_ID - 1
+PARAMETERS_PER_GROUP = PAGES_PER_GROUP * PARAMETERS_PER_PAGE
+MORE_PAGE_ID = MAX_PAGE_ID
+MORE_CONTROL_ID = MAX_ID
+
 
 # Devices for which to ignore ORDER_DEVICEDICT
 # e.g. racks, or else any mapped macros will not be shown in a generated preset
@@ -74,6 +92,25 @@ ORDER_SORTED_IGNORE = ['AudioEffectGroupDevice',
                       'InstrumentGroupDevice',
                       'DrumGroupDevice']
 
+def truncate_parameter_name(name):
+    """Truncate a parameter name intelligently (to use as a control label)
+       - name: string
+       - returns: string of length MAX_NAME_LEN
+    """
+    if len(name) > MAX_NAME_LEN:
+        truncated = ''
+        for i in range(len(name)):
+            # skip lowercase vowels
+            if not name[i] in ['a','e', 'i', 'o', 'u']:
+                truncated += name[i]
+        return truncated[:MAX_NAME_LEN]
+    else:
+        return name
+
+# Rendered JSON (ASCII bytes) for the items of recently used overlays, shared
+# by all presets constructed in this session; { tuple of value items: bytes }
+_overlay_items_json = LRUCache(OVERLAY_ITEMS_CACHE_SIZE)
+
 # --- utility functions
 
 def device_idx_for_midi_channel(midi_channel):
@@ -84,25 +121,19 @@ def device_idx_for_midi_channel(midi_channel):
     assert device_id in range (1,MAX_DEVICE_ID+1), f'{ device_id } exceeds max number of device IDs ({ MAX_DEVICE_ID }).'
     return device_id
 
-def _is_on_off_parameter(p):
+def _is_on_off_parameter(profile):
     """Return whether the parameter has the values "Off" and "On" only.
-        - p: parameter; Live.DeviceParameter.DeviceParameter
+        - profile: profile of the parameter; ParameterProfile
     """
-    if not p.is_quantized:
-        return False
-    values = p.value_items
-    if (len(values) != 2):
-        return False
-    else:
-        return ( (str(values[0]) == "Off") and (str(values[1]) == "On"))
+    return profile.is_on_off
 
-def _needs_overlay(p):
+def _needs_overlay(profile):
     """Return whether the parameter needs an overlay to be generated
        (that enumerates all the values in the list, and that will be attached
        to the parameter in the 'controls' section of the same parameter.
-        - p: parameter; Live.DeviceParameter.DeviceParameter
+        - profile: profile of the parameter; ParameterProfile
     """
-    return p.is_quantized and (not _is_on_off_parameter(p))
+    return profile.is_quantized and (not profile.is_on_off)
 
 # --- functions to determine fader types
 
@@ -122,17 +153,15 @@ def _needs_overlay(p):
 # On
 # -inf dB
 # 3.7 Hz
-def _get_par_value_info(p,v):
-    """ Return the number part and its type for value v of parameter p
-        (using the string representation of the value of a parameter as
-        reported by Ableton)
+def _get_par_value_info(p,vstr):
+    """ Return the number part and its type for the string representation
+        vstr of a value of parameter p (as reported by Ableton)
         - p: parameter; Live.DeviceParameter.DeviceParameter
-        - v: value; float
+        - vstr: value as a string; str
         - result: tuple of the number (int or float) part and the type,
           both as strings; (str,str)
     """
-    vstr = p.str_for_value(v) # get value as a string
-    assert len(vstr) > 0, f'Value string for parameter {p.original_name} with value {v} is empty.'
+    assert len(vstr) > 0, f'Value string for parameter {p.original_name} is empty.'
     # skip leading spaces (string guaranteed not to be empty)
     i = 0
     while vstr[i] == ' ':
@@ -175,20 +204,6 @@ def _is_float_str(s):
     except:
         return False
     
-def _get_par_min_max(p):
-    """Return the minimum and maximum value for parameter p as reported
-       by live in their string representation,
-       - parameter; Live.DeviceParameter.DeviceParameter
-       - result: tuple of minimum and maximum integer values; (float,float)
-           (return (None,None) if conversion failed
-    """
-    (vmin_str,mintype) = _get_par_value_info(p,p.min)
-    (vmax_str,maxtype) = _get_par_value_info(p,p.max)
-    if _is_float_str(vmin_str) and _is_float_str(vmax_str):
-        return ( float(vmin_str) , float(vmax_str) )
-    else:
-        return ( None, None )
-  
 # type strings that (typically) indicate a non-integer valued parameter
 # (the : occurs as part of a compression ratio...)
 NON_INT_TYPES = ['dB', '%', 'Hz', 'kHz', 's', 'ms', '°', ':']
@@ -198,89 +213,132 @@ NON_INT = -1
 SMALL_INT = 0
 BIG_INT = 1
 
-def _is_int_parameter(p):
+class ParameterProfile:
+    """Everything the dumper needs to know about a parameter to decide how
+       to map it and which control to use for it. Computed once per
+       parameter, so Live's str_for_value is called only twice (for the
+       minimum and maximum value) for every parameter.
+    """
+
+    __slots__ = ('min_str', 'max_str',
+                 'min_number_part', 'min_type', 'max_number_part', 'max_type',
+                 'vmin', 'vmax', 'int_class',
+                 'is_quantized', 'value_items', 'is_on_off', 'wants_cc14')
+
+    def __init__(self, p, device_name):
+        """Compute the profile of a parameter.
+           - p: parameter; Live.DeviceParameter.DeviceParameter
+           - device_name: device name for the preset; str
+        """
+        self.min_str = p.str_for_value(p.min)
+        self.max_str = p.str_for_value(p.max)
+        (self.min_number_part, self.min_type) = _get_par_value_info(p,self.min_str)
+        (self.max_number_part, self.max_type) = _get_par_value_info(p,self.max_str)
+        # minimum and maximum value as reported by Live in their string
+        # representation (None if conversion failed)
+        if _is_float_str(self.min_number_part) and _is_float_str(self.max_number_part):
+            (self.vmin, self.vmax) = ( float(self.min_number_part) , float(self.max_number_part) )
+        else:
+            (self.vmin, self.vmax) = ( None, None )
+        # whether parameter has (only) integer values, and if so whether
+        # its range is large ( > 64 ) or small.
+        if (not _is_int_str(self.min_number_part)) or \
+           (not _is_int_str(self.max_number_part)) or \
+           (self.min_type in NON_INT_TYPES) or (self.max_type in NON_INT_TYPES):
+            self.int_class = NON_INT
+        elif int(self.max_number_part) - int(self.min_number_part) > 127:
+            self.int_class = BIG_INT
+        else:
+            self.int_class = SMALL_INT
+        self.is_quantized = p.is_quantized
+        if self.is_quantized:
+            self.value_items = tuple(str(item) for item in p.value_items)
+        else:
+            self.value_items = ()
+        self.is_on_off = self.is_quantized and (self.value_items == ("Off","On"))
+        # Faders that are not mapped to integer parameters want CC14.
+        # Also all parameters for plugins with borked parameter information
+        # want CC14.
+        self.wants_cc14 = (not self.is_quantized) and \
+            ((self.int_class != SMALL_INT) or (device_name in BORKED_DEVICES))
+        
+def _get_par_min_max(profile):
+    """Return the minimum and maximum value for a parameter as reported
+       by live in their string representation,
+       - profile: profile of the parameter; ParameterProfile
+       - result: tuple of minimum and maximum integer values; (float,float)
+           (return (None,None) if conversion failed
+    """
+    return (profile.vmin, profile.vmax)
+  
+def _is_int_parameter(profile):
     """Return whether parameter has (only) integer values, and if so whether
        its range is large ( > 64 ) or small.
-
-       - parameter; Live.DeviceParameter.DeviceParameter
+       - profile: profile of the parameter; ParameterProfile
        - result: NON_INT, SMALL_INT or BIG_INT
     """
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    (max_number_part, max_type) = _get_par_value_info(p,p.max)
-    if (not _is_int_str(min_number_part)) or \
-       (not _is_int_str(max_number_part)) or \
-       (min_type in NON_INT_TYPES) or (max_type in NON_INT_TYPES):
-        return NON_INT
-    if int(max_number_part) - int(min_number_part) > 127:
-        return BIG_INT
-    else:
-        return SMALL_INT
+    return profile.int_class
 
-def _wants_cc14(p, device_name):
+def _wants_cc14(profile):
     """Return whether a parameter wants a 14bit CC fader or not.
-       (Faders that are not mapped to integer parameters want CC14.
-        Also all parameters for plugins with borked parameter information want
-        CC14.)
-    
-       - parameter; Live.DeviceParameter.DeviceParameter
-       - device_name: device name for the preset; str
+       - profile: profile of the parameter; ParameterProfile
     """
-    return (not p.is_quantized) and \
-        ((_is_int_parameter(p) != SMALL_INT) or (device_name in BORKED_DEVICES))
+    return profile.wants_cc14
 
 # --- types of faders
 
-def _is_pan(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    return min_type == 'L'
+def _is_pan(profile):
+    return profile.min_type == 'L'
 
-def _is_percent(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    return min_type == '%'
+def _is_percent(profile):
+    return profile.min_type == '%'
 
-def _is_degree(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    return min_type == '°'
+def _is_degree(profile):
+    return profile.min_type == '°'
 
-def _is_semitone(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    return min_type == 'st'
+def _is_semitone(profile):
+    return profile.min_type == 'st'
 
-def _is_detune(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    return min_type == 'ct'
+def _is_detune(profile):
+    return profile.min_type == 'ct'
 
-def _is_symmetric_dB(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    (max_number_part, max_type) = _get_par_value_info(p,p.max)
+def _is_symmetric_dB(profile):
+    min_number_part = profile.min_number_part
+    max_number_part = profile.max_number_part
     # strip leading + or -
     if (len(min_number_part) > 0) and (min_number_part[0] in ['+','-']):
         min_number_part = min_number_part[1:] 
     if (len(max_number_part) > 0) and (max_number_part[0] in ['+','-']):
         max_number_part = max_number_part[1:]
     # this assumes empty ranges like (-min,-max) or (+min,+max) do not occur
-    return min_type == 'dB' and (min_number_part == max_number_part)
+    return profile.min_type == 'dB' and (min_number_part == max_number_part)
 
-def _is_untyped_float(p):
-    (min_number_part, min_type) = _get_par_value_info(p,p.min)
-    (max_number_part, max_type) = _get_par_value_info(p,p.max)    
-    return (min_type == '') and (max_type == '') and \
-           (_is_float_str(min_number_part) and _is_float_str(max_number_part))
+def _is_untyped_float(profile):
+    return (profile.min_type == '') and (profile.max_type == '') and \
+           (_is_float_str(profile.min_number_part) and _is_float_str(profile.max_number_part))
 
            
-class ElectraOneDumper(io.StringIO, ElectraOneBase):
-    """ElectraOneDumper extends the StringIO class; this allows the gradual
-       construction of a long JSOPN preset string by appending to it.
-       (This is (much) more efficient than concatenating immutable strings.)
+class ElectraOneDumper(ElectraOneBase):
+    """ElectraOneDumper gradually constructs a long JSON preset by appending
+       to a bytearray. (This is (much) more efficient than concatenating
+       immutable strings.) The preset is constructed as ASCII bytes directly,
+       so it can be sent as SysEx without further conversion: all names
+       (that may contain non ASCII characters) are converted to ASCII when
+       they are appended. 
        ElectraOneBase instance used to have access to the log file for
        debugging.
     """
 
     def _append(self, *elements):
-        """Append the (string representation) of the elements to the output
+        """Append the (ASCII encoded string representation) of the elements
+           to the output. Elements that are bytes are appended as is.
+           (Any non ASCII character that slipped through is replaced by '?'.)
         """
         for e in elements:
-            self.write(str(e))
+            if type(e) is bytes:
+                self._preset += e
+            else:
+                self._preset += str(e).encode('ascii','replace')
 
     def _append_comma(self,flag):
         """Append a comma if flag; return true.
@@ -298,18 +356,22 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
            - name: string
            - returns: string of length MAX_NAME_LEN
         """
-        if len(name) > MAX_NAME_LEN:
-            truncated = ''
-            for i in range(len(name)):
-                # skip lowercase vowels
-                if not name[i] in ['a','e', 'i', 'o', 'u']:
-                    truncated += name[i]
-            truncated = truncated[:MAX_NAME_LEN]
+        truncated = truncate_parameter_name(name)
+        if truncated != name:
             self.warning(f'Parameter name {name} truncated to {truncated}!')
-            return(truncated)
-        else:
-            return(name)
+        return(truncated)
                               
+    def _label(self, parameter):
+        """Return the label for the control of a parameter: its name, or its
+           original name when constructing a template.
+           - parameter: the parameter; Live.DeviceParameter.DeviceParameter
+           - result: the label (not truncated); str
+        """
+        if self._is_template:
+            return parameter.original_name
+        else:
+            return parameter.name
+
     def _append_json_pages(self, parameters) :
         """Append the necessary number of pages (and their names).
            - parameters: the list of parameters in the preset.
@@ -318,7 +380,10 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         # one-to-one (This is wrong once we start auto-detecting ADSRs)
         pagecount = 1 + (len(parameters) // PARAMETERS_PER_PAGE)
         self.debug(4,f'Appending {pagecount} pages.')
-        if  pagecount >  MAX_PAGE_ID:
+        if self._group_count > 1:
+            # the last page is reserved for moving to the next group
+            pagecount = min(pagecount, PAGES_PER_GROUP)
+        elif  pagecount >  MAX_PAGE_ID:
             self.debug(3,f'{ pagecount } exceeds max number of pages ({ MAX_PAGE_ID }). Truncating.')
             pagecount =  MAX_PAGE_ID
         self._append(',"pages":[')
@@ -326,6 +391,8 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         for i in range(1,pagecount+1):
             flag = self._append_comma(flag)
             self._append( f'{{"id":{ i },"name":"Page { i }"}}')
+        if self._group_count > 1:
+            self._append( f',{{"id":{ MORE_PAGE_ID },"name":"More"}}')
         self._append(']')
 
     def _append_json_devices(self, cc_map):
@@ -354,22 +421,25 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
     def _append_json_overlay_items(self, value_items):
         """Append the overlay items. Corresponding CC values are computed
            based on the length of value_items and the position in this list.
-           - value_items: list of value items as strings; list of str
+           The JSON for a recently used list of items is not constructed
+           again (see OVERLAY_ITEMS_CACHE_SIZE).
+           - value_items: value items as strings; tuple of str
         """
-        self._append(',"items":[')
-        flag = False
-        for (idx,item) in enumerate(value_items):
-            item_cc_value = cc7_value_for_item_idx(idx, value_items)
-            if item_cc_value not in range(128):
-                self.debug(3,f'MIDI CC value out of range { item_cc_value }. Skipping.')
-            else:
-                flag = self._append_comma(flag)
-                self._append( f'{{"label":"{ item }"' # {{ = {
-                            , f',"index":{ idx }'
-                            , f',"value":{ item_cc_value }'
-                            , '}'
-                            )
-        self._append(']')
+        items_json = _overlay_items_json.get(value_items)
+        if items_json == None:
+            items = []
+            for (idx,item) in enumerate(value_items):
+                item_cc_value = cc7_value_for_item_idx(idx, value_items)
+                if item_cc_value not in range(128):
+                    self.debug(3,f'MIDI CC value out of range { item_cc_value }. Skipping.')
+                else:
+                    items.append( f'{{"label":"{ self.ascii_str(item) }"' # {{ = {
+                                  f',"index":{ idx }'
+                                  f',"value":{ item_cc_value }'
+                                  '}' )
+            items_json = (',"items":[' + ','.join(items) + ']').encode('ascii')
+            _overlay_items_json.put(value_items,items_json)
+        self._append(items_json)
 
     def _append_json_overlays(self, parameters, cc_map):
         """Append the necessary overlays for all quantised parameters (that
@@ -383,30 +453,32 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         self.debug(4,f'Appending overlays.')
         # record constructed overlays; prevent duplicates
         overlay_map = {} # { parameter_name : index of constructed overlay }
-        overlays = [] # [ list of lists of overlay_items ]
+        overlays = {} # { tuple of overlay items : index of constructed overlay }
         self._append(',"overlays":[')
         overlay_idx = 1
         flag = False # for appending commas
         for p in parameters:
             cc_info = cc_map.get_cc_info(p)
-            if cc_info.is_mapped() and _needs_overlay(p):
+            profile = self._profiles[p.original_name]
+            if cc_info.is_mapped() and _needs_overlay(profile):
+                value_items = profile.value_items
                 # test whether overlay for same list of items has been created
                 # before; and use index of that overlay if found
-                if p.value_items in overlays:
-                    overlay_map[p.original_name] = 1 + overlays.index(p.value_items)
+                if value_items in overlays:
+                    overlay_map[p.original_name] = overlays[value_items]
                 elif overlay_idx > MAX_OVERLAY_ID:
                     self.debug(3,f'{ overlay_idx } exceeds max number of overlays ({ MAX_OVERLAY_ID }).')
-                elif len(p.value_items) > 128:
+                elif len(value_items) > 128:
                     # do not make the overlay in this case
-                    self.debug(3,f'Too many overlay items { len(p.value_items) }. Skipping all.')
+                    self.debug(3,f'Too many overlay items { len(value_items) }. Skipping all.')
                 else: # append a new overlay and remember it
                     flag = self._append_comma(flag)
-                    self.debug(5,f'Appending overlay for {p.original_name} with values {[s for s in p.value_items]} at index {overlay_idx}.')
-                    overlays.append(p.value_items) # stored at overlay_idx-1 in list
+                    self.debug(5,f'Appending overlay for {p.original_name} with values {list(value_items)} at index {overlay_idx}.')
+                    overlays[value_items] = overlay_idx
                     overlay_map[p.original_name] = overlay_idx
                     # {{ to escape { in f string
                     self._append(f'{{"id":{ overlay_idx }')
-                    self._append_json_overlay_items(p.value_items)
+                    self._append_json_overlay_items(value_items)
                     self._append( '}')
                     overlay_idx += 1
         self._append(']')
@@ -432,8 +504,8 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         self._append( ',"type":"pad"'
                     , ',"mode":"toggle"'
                     , ',"values":[{"message":{"type":"cc7"'
-                    ,                       ',"offValue": 0'
-                    ,                       ',"onValue": 127'
+                    ,                       ',"offValue":0'
+                    ,                       ',"onValue":127'
                     ,                      f',"parameterNumber":{ cc_info.get_cc_no() }'
                     ,                      f',"deviceId":{ device_id }'
                     ,                       '}' 
@@ -449,7 +521,7 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         device_id = device_idx_for_midi_channel(cc_info.get_midi_channel())
         self._append( ',"type":"list"'
                     , ',"values":[{"message":{"type":"cc7"' 
-                    ,                      f',"parameterNumber":{ cc_info.get_cc_no() } '
+                    ,                      f',"parameterNumber":{ cc_info.get_cc_no() }'
                     ,                      f',"deviceId":{ device_id }'
                     ,                       '}' 
                     ,           f',"overlayId":{ overlay_idx }'
@@ -480,26 +552,30 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         device_id = device_idx_for_midi_channel(cc_info.get_midi_channel())
         self._append(    ',"type":"fader"')
         if thin: 
-            self._append(',"variant": "thin"')
+            self._append(',"variant":"thin"')
         min = 0
         if cc_info.is_cc14():
             max = 16383
             self._append(',"values":['
                         ,   '{"message":{"type":"cc14"'
-                        ,              ',"lsbFirst":false'
                         )
+            # lsbFirst is false by default
+            if not COMPACT_PRESETS:
+                self._append(',"lsbFirst":false')
         else:
             max = 127        
-            self._append(',"type":"fader"' 
-                        ,',"values":['
+            self._append(',"values":['
                         ,   '{"message":{"type":"cc7"'
                         )
         self._append(                 f',"parameterNumber":{ cc_info.get_cc_no() }'
                     ,                 f',"deviceId":{ device_id }'
-                    ,                 f',"min":{ min }'
-                    ,                 f',"max":{ max }'
-                    ,                  '}'
                     )
+        # min and max are 0 and the maximum for the message type by default
+        if not COMPACT_PRESETS:
+            self._append(             f',"min":{ min }'
+                        ,             f',"max":{ max }'
+                        )
+        self._append(                  '}')
         if vmin != None:
             self._append(  f',"min":{ vmin }'
                         ,  f',"max":{ vmax }'
@@ -524,7 +600,7 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         # float faders are internally integer valued faders with a special
         # formatter function to display them as floats. Fader resolution is
         # adjusted according to range
-        (vmin,vmax) = _get_par_min_max(p)
+        (vmin,vmax) = _get_par_min_max(self._profiles[p.original_name])
         if (vmin > -10) and (vmax < 10):
             self._append_json_generic_fader(cc_info, True, 1000*vmin, 1000*vmax,"formatSmallFloat")
         elif (vmin > -100) and (vmax < 100):
@@ -535,7 +611,7 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         else:
             self._append_json_generic_fader(cc_info, True, None, None, "defaultFormatter")
             # update control id to signal ableton must provide its values
-            cc_info.set_control_id((id+1,0))
+            cc_info = cc_info.with_control_id((id+1,0))
         return cc_info
     
     def _append_json_fader(self, id, device_name, parameter, cc_info):
@@ -549,38 +625,39 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
            - return: updated cc_info; CCInfo.
         """
         self.debug(5,f'Appending fader for {parameter.original_name}')
-        (vmin,vmax) = _get_par_min_max(parameter)
+        profile = self._profiles[parameter.original_name]
+        (vmin,vmax) = _get_par_min_max(profile)
         # test if parameter values can be represented as numebrs
         if (vmin == None) or (vmax == None):
             self._append_json_generic_fader(cc_info, True, None, None, "defaultFormatter")
             # update control id to signal ableton must provide its values
-            cc_info.set_control_id((id+1,0))
-        elif _is_pan(parameter):
+            cc_info = cc_info.with_control_id((id+1,0))
+        elif _is_pan(profile):
             # invert vmin; p.min typically equals 50L, so vmin=50
             self._append_json_generic_fader(cc_info, True, -vmin, vmax, "formatPan")
-        elif _is_percent(parameter):
+        elif _is_percent(profile):
             # scale by factor 10 to allow fractional percentages
             self._append_json_generic_fader(cc_info, True, 10*vmin, 10*vmax, "formatPercent")
-        elif _is_degree(parameter):
+        elif _is_degree(profile):
             self._append_json_generic_fader(cc_info, True, vmin, vmax, "formatDegree")
-        elif _is_semitone(parameter):
+        elif _is_semitone(profile):
             self._append_json_generic_fader(cc_info, True, vmin, vmax, "formatSemitone")
-        elif _is_detune(parameter):
+        elif _is_detune(profile):
             self._append_json_generic_fader(cc_info, True, vmin, vmax, "formatDetune")
-        elif _is_symmetric_dB(parameter):
+        elif _is_symmetric_dB(profile):
             # scale by factor 10 to allow fractional dBs
             self._append_json_generic_fader(cc_info, True, 10*vmin, 10*vmax, "formatdB")
         elif device_name in BORKED_DEVICES:
             # For devices with borked parameter information (plugins) assume float always
             cc_info = self._append_json_float_fader(id,parameter,cc_info)            
-        elif _is_int_parameter(parameter) != NON_INT:
+        elif _is_int_parameter(profile) != NON_INT:
             self._append_json_generic_fader(cc_info, True, vmin, vmax, None)
-        elif _is_untyped_float(parameter): # also true for int type parameters
+        elif _is_untyped_float(profile): # also true for int type parameters
             cc_info = self._append_json_float_fader(id,parameter,cc_info)            
         else:
             self._append_json_generic_fader(cc_info, True, None, None, "defaultFormatter")
             # update control id to signal ableton must provide its values
-            cc_info.set_control_id((id+1,0))
+            cc_info = cc_info.with_control_id((id+1,0))
         return cc_info
     
     def _append_json_control(self, id, device_name, parameter, cc_info,overlay_map):
@@ -596,7 +673,8 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
            - overlay_map: mapping of parameter names to the index of the overlays contstructed
            - return: updated cc_info; CCInfo.
         """
-        self.debug(4,f'Appending JSON control for {parameter.original_name}, with range: {parameter.str_for_value(parameter.min)}..{parameter.str_for_value(parameter.max)}.')
+        profile = self._profiles[parameter.original_name]
+        self.debug(4,f'Appending JSON control for {parameter.original_name}, with range: {profile.min_str}..{profile.max_str}.')
         # set and check main control attributes
         if id not in range(MAX_ID):
             self.debug(3,f'{ id } exceeds max number of IDs ({ MAX_ID }).')
@@ -615,17 +693,21 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
             self.debug(3,f'{ pot } exceeds max number of pots ({ MAX_POT_ID }).')
             return
         self._append( f'{{"id":{ id+1 }' # {{ is escaced {
-                    , f',"name":"{ self._truncate_parameter_name(parameter.name) }"' # use name as label for control
-                    ,  ',"visible":true' 
-                    , f',"color":"{ PRESET_COLOR }"' 
-                    , f',"pageId":{ page }'
+                    , f',"name":"{ self.ascii_str(self._truncate_parameter_name(self._label(parameter))) }"'
+                    )
+        # visible is true by default
+        if not COMPACT_PRESETS:
+            self._append(',"visible":true')
+        if not (COMPACT_PRESETS and (PRESET_COLOR == DEFAULT_COLOR)):
+            self._append(f',"color":"{ PRESET_COLOR }"')
+        self._append( f',"pageId":{ page }'
                     , f',"controlSetId":{ controlset }'
                     , f',"inputs":[{{"potId":{ pot },"valueId":"value"}}]'
                     )
         self._append_json_bounds(id)
         # append the actual contro: a list, an on/off or a fader
         # (ADSRs are too difficult to detect reliably)
-        if _needs_overlay(parameter):
+        if _needs_overlay(profile):
             # check if overlay succesfully created
             if parameter.original_name in overlay_map:
                 overlay_idx = overlay_map[parameter.original_name]
@@ -633,8 +715,8 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
             else: # overlay not constructed so dummy added to this control; unmap it for safety
                 self.debug(3,f'No overlay found for parameter {parameter}. Unmapping it.')
                 self._append_json_list(0,cc_info) 
-                cc_info.set_cc_no(UNMAPPED_CC)
-        elif _is_on_off_parameter(parameter):
+                cc_info = cc_info.with_cc_no(UNMAPPED_CC)
+        elif _is_on_off_parameter(profile):
             self._append_json_toggle(cc_info)
         else:
             cc_info = self._append_json_fader(id,device_name,parameter,cc_info)
@@ -667,9 +749,38 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
                 cc_info = self._append_json_control(id,device_name,p,cc_info,overlay_map)
                 cc_map.update(p,cc_info)
                 id += 1
+        if self._group_count > 1:
+            flag = self._append_comma(flag)
+            self._append_json_more_control()
         self._append(']')
         return cc_map
 
+    def _append_json_more_control(self):
+        """Append the control on the last page of a preset for a group,
+           that shows which group is next. (Selecting its page, reported
+           by the default LUA script, moves to the next group; the control
+           itself does not send MIDI.)
+        """
+        next_group = (self._group + 1) % self._group_count
+        self._append( f'{{"id":{ MORE_CONTROL_ID }' # {{ is escaced {
+                    , f',"name":"Group { next_group+1 }/{ self._group_count }"'
+                    , f',"pageId":{ MORE_PAGE_ID }'
+                    ,  ',"controlSetId":1'
+                    ,  ',"inputs":[{"potId":1,"valueId":"value"}]'
+                    )
+        self._append_json_bounds(0)
+        self._append( ',"type":"pad"'
+                    , ',"mode":"momentary"'
+                    , ',"values":[{"message":{"type":"virtual"'
+                    ,                       ',"offValue":0'
+                    ,                       ',"onValue":127'
+                    ,                       ',"parameterNumber":1'
+                    ,                       '}' 
+                    ,            ',"id":"value"'
+                    ,            '}]'
+                    , '}'
+                    )
+
     def _construct_json_preset(self, device_name, parameters, cc_map):
         """Construct a Electra One JSON preset for the given list of Ableton Live 
            Device/Instrument parameters using the info in the supplied cc_map
@@ -680,7 +791,7 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
            - parameters: parameters to include; list of Live.DeviceParameter.DeviceParameter
            - cc_map: corresponding cc_map constructed first using
              _construct_cc_map. 
-           - result: the preset (a JSON object in E1 .epr format); str
+           - result: the preset (a JSON object in E1 .epr format); bytes (ASCII)
         """
         self.debug(3,'Construct JSON preset')
         # create a project id from the device_name 'randomly'
@@ -690,7 +801,7 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         random.seed(device_name)
         project_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=20))
         self._append( f'{{"version":{ VERSION }' # {{ = { in f-string
-                    , f',"name":"{ device_name[:MAX_NAME_LEN] }"'
+                    , f',"name":"{ self.ascii_str(device_name[:MAX_NAME_LEN]) }"'
                     , f',"projectId":"{ project_id }"'
                     )
         self._append_json_pages(parameters)
@@ -704,50 +815,243 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         # (to indicate that Live should supply the string value for the parameter)
         cc_map = self._append_json_controls(device_name,parameters,cc_map,overlay_map)
         self._append(  '}' )
-        # return the string constructed within the StringIO object as preset
+        # return the ASCII bytes constructed as preset
         # as well as the (possibly modified) cc map
-        preset = self.getvalue()
-        # remove/remap any non-ASCII characters
-        preset = self.ascii_str(preset)
-        return (preset,cc_map)
+        return (bytes(self._preset),cc_map)
 
-    def _construct_cc_map(self, device_name, parameters):
-        """Construct a cc_map for the list of parameters. Map no more parameters
-           then specified by MAX_CC7_PARAMETERS and MAX_CC14_PARAMETERS and use
-           no more MIDI channels than specified by MAX_MIDI_EFFECT_CHANNELS
-           - device_name: name of the device (for warnings); str
-           - parameters:  parameter list; list of Live.DeviceParameter.DeviceParameter
-           - result: cc map; CCMap
+    def _max_channel(self):
+        """Return the last MIDI channel to assign parameters to.
+           - result: MIDI channel; int (1..16)
         """
-        self.debug(3,'Construct CC map')
-        # 14bit CC controls are mapped first; they consume two CC parameters
-        # (i AND i+32). 7 bit CC controls are mapped next filling any empty
-        # slots.
-        # For some reason, only the first 32 CC parameters can be mapped to
-        # 14bit CC controls. 
-        cc_map = CCMap({})
         if MAX_MIDI_EFFECT_CHANNELS == -1:
-            max_channel = 16
+            return 16
         else:
             # config checks that this is always <= 16
-            max_channel = MIDI_EFFECT_CHANNEL + MAX_MIDI_EFFECT_CHANNELS -1
+            return MIDI_EFFECT_CHANNEL + MAX_MIDI_EFFECT_CHANNELS -1
+
+    def _cc_capacity(self):
+        """Return the number of CC numbers available for parameters
+           (on all MIDI channels that may be used).
+           - result: ; int
+        """
+        return 128 * (self._max_channel() - MIDI_EFFECT_CHANNEL + 1)
+
+    def _split_cc_parameters(self, parameters):
+        """Split the parameters in those to assign to 14bit controllers
+           and those to assign to 7bit controllers, respecting
+           MAX_CC14_PARAMETERS and MAX_CC7_PARAMETERS. Parameters that
+           would be assigned to a 14bit controller are assigned to a 7bit
+           controller instead when there are not enough CC numbers
+           available to assign all parameters otherwise.
+           - parameters:  parameter list; list of Live.DeviceParameter.DeviceParameter
+           - result: CC14 and CC7 parameters; (list,list)
+        """
         # get the list of parameters to be assigned to 14bit controllers
-        cc14pars = [p for p in parameters if _wants_cc14(p,device_name)]
+        cc14pars = [p for p in parameters if _wants_cc14(self._profiles[p.original_name])]
         skipped_cc14pars = []
         self.debug(4,f'{len(cc14pars)} CC14 parameters found.')
         if (MAX_CC14_PARAMETERS != -1) and (MAX_CC14_PARAMETERS < len(cc14pars)):
-            cc14pars = cc14pars[:MAX_CC14_PARAMETERS]
             skipped_cc14pars = cc14pars[MAX_CC14_PARAMETERS:]
+            cc14pars = cc14pars[:MAX_CC14_PARAMETERS]
             self.warning(f'Truncated CC14 parameters to {MAX_CC14_PARAMETERS}!')
-        cur_cc14par_idx = 0
         # get the list of parameters to be assigned to 7bit controllers        
-        cc7pars = [p for p in parameters if not _wants_cc14(p,device_name)]
+        cc7pars = [p for p in parameters if not _wants_cc14(self._profiles[p.original_name])]
+        # at most 32 CC14 parameters fit on a channel, and each uses two CC
+        # numbers: with n CC14 parameters, len(parameters)+n CC numbers are
+        # needed
+        max_cc14pars = max(0, min(self._cc_capacity() // 4, self._cc_capacity() - len(cc14pars) - len(cc7pars)))
+        if max_cc14pars < len(cc14pars):
+            self.debug(4,f'Assigning {len(cc14pars)-max_cc14pars} CC14 parameters to CC7 controllers instead.')
+            skipped_cc14pars += cc14pars[max_cc14pars:]
+            cc14pars = cc14pars[:max_cc14pars]
         # append parameters that could not be assigned a 14bit controller
         cc7pars += skipped_cc14pars
         self.debug(4,f'{len(cc7pars)} CC7 parameters found (including skipped CC14 parameters).')
         if (MAX_CC7_PARAMETERS != -1) and (MAX_CC7_PARAMETERS < len(cc7pars)):
             cc7pars = cc7pars[:MAX_CC7_PARAMETERS]
             self.warning(f'Truncated CC7 parameters to {MAX_CC7_PARAMETERS}!')
+        return (cc14pars,cc7pars)
+
+    def _allocation_fname(self, device_name):
+        """Return the name of the file storing the CC allocation table for
+           a device.
+           - device_name: name of the device; str
+           - result: ; Path
+        """
+        return self.allocationspath() / f'{ device_name }.json'
+
+    def _load_allocation(self, fname):
+        """Load a CC allocation table (empty if it does not exist). The
+           table records the group (see USE_PAGE_GROUPS) and the CC
+           assigned to every parameter.
+           - fname: file to load from; Path
+           - result: the table; { parameter original_name: (group,channel,is_cc14,cc_no) }
+        """
+        if not os.path.exists(fname):
+            return {}
+        try:
+            with open(fname,'r') as f:
+                table = json.load(f)
+            return { name: tuple(entry) for (name,entry) in table.items() }
+        except:
+            self.warning(f'Failed to load CC allocation table {fname}: {sys.exc_info()[1]}')
+            return {}
+
+    def _save_allocation(self, fname, allocation):
+        """Save a CC allocation table.
+           - fname: file to save to; Path
+           - allocation: the table; { parameter original_name: (group,channel,is_cc14,cc_no) }
+        """
+        try:
+            os.makedirs(self.allocationspath(), exist_ok=True)
+            tmp_fname = str(fname) + '.tmp'
+            with open(tmp_fname,'w') as f:
+                json.dump(allocation,f,indent=0)
+            os.replace(tmp_fname,fname)
+        except:
+            self.warning(f'Failed to save CC allocation table {fname}: {sys.exc_info()[1]}')
+
+    def _stable_groups(self, device_name, parameters, parameters_per_group):
+        """Split the parameters into groups (for STABLE_CC_ALLOCATION):
+           parameters stay in the group recorded in the allocation table of
+           the device (if it still has room), so they keep their CC when
+           parameters are added or removed before them. Other parameters
+           fill the first groups with room. Within a group, parameters keep
+           their order.
+           - device_name: name of the device; str
+           - parameters: parameter list; list of Live.DeviceParameter.DeviceParameter
+           - parameters_per_group: maximal size of a group; int
+           - result: the groups; list of list of Live.DeviceParameter.DeviceParameter
+        """
+        table = self._load_allocation(self._allocation_fname(device_name))
+        groups = [ [] for g in range(self._group_count) ]
+        rest = []
+        for p in parameters:
+            entry = table.get(p.original_name)
+            if (entry != None) and (entry[0] < self._group_count) and \
+               (len(groups[entry[0]]) < parameters_per_group):
+                groups[entry[0]].append(p)
+            else:
+                rest.append(p)
+        for p in rest:
+            group = next(g for g in groups if len(g) < parameters_per_group)
+            group.append(p)
+        order = { p.original_name: idx for (idx,p) in enumerate(parameters) }
+        return [ sorted(g, key=lambda p: order[p.original_name]) for g in groups ]
+
+    def _construct_stable_cc_map(self, device_name, parameters):
+        """Construct a cc_map for the list of parameters (like
+           _construct_cc_map), keeping the CC assignments of all parameters
+           that were assigned before (as recorded in the allocation table
+           of the device). New parameters are assigned to free slots. Slots
+           of parameters that are no longer present remain reserved (so
+           these parameters get their slot back when they return) unless
+           the slots are needed for new parameters.
+           For devices split into groups, only the assignments in the
+           current group are considered (see _stable_groups).
+           - device_name: name of the device; str
+           - parameters:  parameter list; list of Live.DeviceParameter.DeviceParameter
+           - result: cc map; CCMap
+        """
+        fname = self._allocation_fname(device_name)
+        table = self._load_allocation(fname)
+        # the assignments of parameters in the current group (ignoring
+        # parameters now in another group)
+        elsewhere = { p.original_name for p in self._other_parameters }
+        allocation = { name: entry[1:] for (name,entry) in table.items()
+                       if (entry[0] == self._group) and (name not in elsewhere) }
+        channels = range(MIDI_EFFECT_CHANNEL,self._max_channel()+1)
+        free = { channel: [ True for i in range(0,128)] for channel in channels }
+
+        def is_free(channel, is_cc14, cc_no):
+            if channel not in free:
+                return False
+            if is_cc14:
+                return (cc_no in range(32)) and free[channel][cc_no] and free[channel][cc_no+32]
+            else:
+                return (cc_no in range(128)) and free[channel][cc_no]
+
+        def occupy(channel, is_cc14, cc_no):
+            free[channel][cc_no] = False
+            if is_cc14:
+                free[channel][cc_no+32] = False
+
+        def release(channel, is_cc14, cc_no):
+            free[channel][cc_no] = True
+            if is_cc14:
+                free[channel][cc_no+32] = True
+
+        def find_free(is_cc14):
+            for channel in channels:
+                for cc_no in range(32 if is_cc14 else 128):
+                    if is_free(channel, is_cc14, cc_no):
+                        return (channel, is_cc14, cc_no)
+            return None
+
+        cc_map = CCMap({})
+        (cc14pars,cc7pars) = self._split_cc_parameters(parameters)
+        wanted = [ (p,IS_CC14) for p in cc14pars ] + [ (p,IS_CC7) for p in cc7pars ]
+        present = { p.original_name for (p,is_cc14) in wanted }
+        # keep the previous assignment of parameters (if still valid)
+        new = []
+        for (p,is_cc14) in wanted:
+            slot = allocation.get(p.original_name)
+            if (slot != None) and (slot[1] == is_cc14) and is_free(*slot):
+                occupy(*slot)
+                cc_map.map(p, CCInfo((UNMAPPED_ID,slot[0],slot[1],slot[2])) )
+            else:
+                allocation.pop(p.original_name,None)
+                new.append((p,is_cc14))
+        # reserve the slots of parameters no longer present
+        absent = []
+        for name in list(allocation.keys()):
+            if name not in present:
+                if is_free(*allocation[name]):
+                    occupy(*allocation[name])
+                    absent.append(name)
+                else:
+                    del allocation[name]
+        # assign new parameters to free slots (releasing reserved ones if needed)
+        for (p,is_cc14) in new:
+            slot = find_free(is_cc14)
+            while (slot == None) and (len(absent) > 0):
+                release(*allocation.pop(absent.pop(0)))
+                slot = find_free(is_cc14)
+            if slot == None:
+                self.warning('Not all parameters could be mapped.')
+                break
+            occupy(*slot)
+            allocation[p.original_name] = slot
+            cc_map.map(p, CCInfo((UNMAPPED_ID,slot[0],slot[1],slot[2])) )
+        self.debug(4,f'{len(wanted)-len(new)} CC assignments kept, {len(new)} new, {len(absent)} reserved.')
+        # update the assignments of the current group in the table
+        new_table = { name: entry for (name,entry) in table.items()
+                      if (entry[0] != self._group) and (name not in present) }
+        new_table.update({ name: (self._group,) + slot for (name,slot) in allocation.items() })
+        if new_table != table:
+            self._save_allocation(fname, new_table)
+        return cc_map
+
+    def _construct_cc_map(self, device_name, parameters):
+        """Construct a cc_map for the list of parameters. Map no more parameters
+           then specified by MAX_CC7_PARAMETERS and MAX_CC14_PARAMETERS and use
+           no more MIDI channels than specified by MAX_MIDI_EFFECT_CHANNELS
+           - device_name: name of the device (for warnings); str
+           - parameters:  parameter list; list of Live.DeviceParameter.DeviceParameter
+           - result: cc map; CCMap
+        """
+        self.debug(3,'Construct CC map')
+        # 14bit CC controls are mapped first; they consume two CC parameters
+        # (i AND i+32). 7 bit CC controls are mapped next filling any empty
+        # slots.
+        # For some reason, only the first 32 CC parameters can be mapped to
+        # 14bit CC controls. 
+        if STABLE_CC_ALLOCATION:
+            return self._construct_stable_cc_map(device_name, parameters)
+        cc_map = CCMap({})
+        max_channel = self._max_channel()
+        (cc14pars,cc7pars) = self._split_cc_parameters(parameters)
+        cur_cc14par_idx = 0
         cur_cc7par_idx = 0
         # add parameters per channel; break if all parameters are assigned
         for channel in range(MIDI_EFFECT_CHANNEL,max_channel+1):
@@ -839,36 +1143,77 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         self.debug(3,f'Filtered and order parameters: {[p.original_name for p in parameters]}')
         return parameters
 
-    def __init__(self, c_instance, device): 
+    def __init__(self, c_instance, device, template_name=None, group=0, device_name=None): 
         """Construct an Electra One JSON preset and a corresponding
            dictionary for the mapping to MIDI CC values, for the given device.
            Use get_preset() for the contructed object to obtain the result.
            Inclusion and order of parameters is controlled by the
            ORDER parameter
+           If a template name is given, the preset is constructed as a
+           template for all devices with the same parameter layout (like
+           racks): it gets the template name instead of the device name, and
+           controls are labelled with the original parameter names (the actual
+           names must be set on the E1 after uploading).
+           If the device has more parameters than fit in a preset (and
+           USE_PAGE_GROUPS), only the preset for the specified group of
+           pages is constructed.
            - c_instance: controller instance parameter as passed by Live
            - device: device whose parameters must be dumped; Live.Device.Device
+           - template_name: name of the template (optional); str
+           - group: index of the group to construct the preset for; int
+           - device_name: name of the device (optional, derived from the
+             device if not given); str
         """
-        # initialise a StringIO object to incrementally construct the preset
-        # string in; this is more efficient than appending string constants
-        io.StringIO.__init__(self)
+        # initialise a bytearray to incrementally construct the preset
+        # in; this is more efficient than appending string constants
+        self._preset = bytearray()
         ElectraOneBase.__init__(self, c_instance)
-        device_name = self.get_device_name(device)
+        self._is_template = (template_name != None)
+        if self._is_template:
+            device_name = template_name
+        elif device_name == None:
+            device_name = self.get_device_name(device)
         self.debug(3,f'Dumper for device { device_name } loaded.')
-        # log information about found parameters
-        self.debug(5,'Dumper found the following parameters and their range:')
         device_parameters = make_device_parameters_unique(device)
-        for p in device_parameters:
-            min_vstr = p.str_for_value(p.min)
-            max_vstr = p.str_for_value(p.max)
-            self.debug(5,f'{p.original_name} ({p.name}): {min_vstr} .. {max_vstr}. Quantized: {p.is_quantized}.')
         # filter and order the parameters to include in the preset
         parameters = self._filter_and_order_parameters(device_name, device_parameters)
+        # split the parameters into groups if they do not fit in one preset;
+        # only the parameters in the requested group are processed further
+        # (groups are smaller if there are not enough CC numbers available)
+        parameters_per_group = min(PARAMETERS_PER_GROUP, self._cc_capacity())
+        if USE_PAGE_GROUPS and (len(parameters) > min(MAX_ID, self._cc_capacity())):
+            self._group_count = (len(parameters) + parameters_per_group - 1) // parameters_per_group
+            self._group = group if group < self._group_count else 0
+            if STABLE_CC_ALLOCATION:
+                groups = self._stable_groups(device_name, parameters, parameters_per_group)
+            else:
+                groups = [ parameters[first:first+parameters_per_group]
+                           for first in range(0,len(parameters),parameters_per_group) ]
+            self._other_parameters = [ p for (g,ps) in enumerate(groups) if g != self._group for p in ps ]
+            parameters = groups[self._group]
+            self.debug(3,f'Constructing preset for group {self._group+1} of {self._group_count}.')
+        else:
+            self._group_count = 1
+            self._group = 0
+            self._other_parameters = []
+        # profile the parameters; { original_name: ParameterProfile }
+        self._profiles = { p.original_name: ParameterProfile(p,device_name)
+                           for p in parameters }
+        # log information about found parameters
+        self.debug(5,'Dumper found the following parameters and their range:')
+        for p in parameters:
+            profile = self._profiles[p.original_name]
+            self.debug(5,f'{p.original_name} ({p.name}): {profile.min_str} .. {profile.max_str}. Quantized: {profile.is_quantized}.')
         # construct the ccmap
         self._cc_map = self._construct_cc_map(device_name, parameters)
         # construct the preset;
         # this may modify the cc_map, to set the control indices for parameters
         # that need to use Ableton generated value strings.
         (self._preset_json, self._cc_map) = self._construct_json_preset(device_name, parameters, self._cc_map)
+        # parameters in other groups are not mapped
+        for p in self._other_parameters:
+            if not self._cc_map.is_mapped(p):
+                self._cc_map.map(p,UNMAPPED_CCINFO)
         # dump CC map now (because constructing preset may change it still)
         if not DUMP: # no need to write this to the log if the same thing is dumped
             self.debug(3,f'CC map constructed: { self._cc_map }')
@@ -877,5 +1222,5 @@ class ElectraOneDumper(io.StringIO, ElectraOneBase):
         """Return the constructed preset, LUA script and CC map as PresetInfo.
            - result: preset, lua and cc map; PresetInfo
         """
-        return PresetInfo(self._preset_json, "", self._cc_map)
+        return PresetInfo(self._preset_json, "", self._cc_map, group_count=self._group_count)
         
@@ -14,9 +14,11 @@
 import Live
 
 # Local imports
-from .config import USE_ABLETON_VALUES
+from .config import USE_ABLETON_VALUES, USE_VALUE_LISTENERS, VALUE_STRING_CACHE_SIZE, MAX_VALUE_UPDATES_PER_TICK, \
+    BACKGROUND_REFRESH_PER_TICK
 from .CCInfo import CCInfo, CCMap, UNMAPPED_ID
 from .ElectraOneBase import ElectraOneBase
+from .LRUCache import LRUCache
 from .UniqueParameters import make_device_parameters_unique
 
 class GenericDeviceController(ElectraOneBase):
@@ -24,7 +26,7 @@ class GenericDeviceController(ElectraOneBase):
        in the mixer): build MIDI maps, refresh state
     """
 
-    def __init__(self, c_instance, device, cc_map):
+    def __init__(self, c_instance, device, cc_map, control_pages=None, cc_pages=None):
         """Create a new device controller for the device and the
            associated cc-map. It is assumed the preset is already
            present on the E1 or will be uploaded there shortly
@@ -32,6 +34,11 @@ class GenericDeviceController(ElectraOneBase):
            - c_instance: Live interface object (see __init.py__)
            - device: the device; Live.Device.Device
            - cc_map: the preset cc-map; CCMap
+           - control_pages: page of each control in the preset, used to
+             prioritise value updates for the visible page (optional);
+             { int: int }
+           - cc_pages: page of each CC in the preset, used to refresh the
+             visible page first (optional); { (int,int): int }
         """
         ElectraOneBase.__init__(self, c_instance)
         self._device = device # TODO: needed to detect whether device is already deleted
@@ -40,6 +47,121 @@ class GenericDeviceController(ElectraOneBase):
         self._cc_map = cc_map
         # dictionary to keep track of string value updates
         self._values = { }
+        self._compile_plan()
+        # value listeners added to the parameters in self._value_plan
+        # (added when the state is first refreshed); list of (parameter,listener)
+        self._listeners = None
+        # indices (in self._value_plan) of parameters whose value changed
+        # since the last refresh; set of int
+        self._dirty = set()
+        # cache of value strings of continuous parameters;
+        # { (id(parameter),value): str }
+        self._value_strings = LRUCache(VALUE_STRING_CACHE_SIZE)
+        self._control_pages = control_pages
+        self._cc_pages = cc_pages
+        # page currently visible on the E1
+        self._visible_page = 1
+        # entries of the plan still to be refreshed after a full refresh
+        # (see refresh_state); list of entries
+        self._background_refresh = []
+        # value updates not yet sent to the E1 (see _send_pending_values);
+        # { control_tuple: str }
+        self._pending_values = { }
+        # value updates to send to the E1 in one batch (see
+        # _flush_value_updates); { control_tuple: str }
+        self._value_updates = { }
+
+    def _compile_plan(self):
+        """Compile the list of mapped parameters once, so that building
+           the MIDI map and refreshing the state never need to look at
+           unmapped parameters or consult the CC map again.
+           Sets self._plan to a list of entries
+           (parameter, ccinfo, MIDI channel, CC no, is_cc14?, control id, value items)
+           (with MIDI channel numbered 1..16) for all mapped parameters, and
+           self._value_plan to the sublist of entries for which Ableton must
+           send the value string. For quantized parameters the value string
+           is simply the value item for the current (integer) value, so
+           their value items are copied once here (None for other parameters)
+           and str(p) is never needed for them.
+        """
+        self._plan = []
+        self._value_plan = []
+        if self._cc_map == None:
+            return
+        for p in self._parameters:
+            ccinfo = self._cc_map.get_cc_info(p)
+            if ccinfo.is_mapped():
+                control_tuple = ccinfo.get_control_id()
+                value_items = None
+                if USE_ABLETON_VALUES and (control_tuple[0] != UNMAPPED_ID) \
+                   and p.is_quantized:
+                    value_items = tuple(p.value_items)
+                    if len(value_items) == 0:
+                        value_items = None
+                entry = (p, ccinfo, ccinfo.get_midi_channel(), ccinfo.get_cc_no(),
+                         ccinfo.is_cc14(), control_tuple, value_items)
+                self._plan.append(entry)
+                if USE_ABLETON_VALUES and (control_tuple[0] != UNMAPPED_ID):
+                    self._value_plan.append(entry)
+            else:
+                self.debug(5,f'{ p.original_name } ({p.name}) not mapped.')
+        self.debug(4,f'{ len(self._plan) } of { len(self._parameters) } parameters mapped for { self._device_name } ({ len(self._value_plan) } with value strings).')
+
+    def _value_string(self, p):
+        """Return the Ableton value string of a (continuous) parameter,
+           taking it from the cache if possible.
+           - p: parameter; Live.DeviceParameter.DeviceParameter
+           - result: the value string; str
+        """
+        if VALUE_STRING_CACHE_SIZE <= 0:
+            return str(p)
+        key = (id(p),p.value)
+        pstr = self._value_strings.get(key)
+        if pstr == None:
+            pstr = str(p)
+            self._value_strings.put(key,pstr)
+        return pstr
+
+    def _make_value_listener(self, index):
+        """Return a value listener that marks an entry in self._value_plan as
+           changed.
+           - index: index of the entry in self._value_plan; int
+           - result: the listener; function
+        """
+        def listener():
+            self._dirty.add(index)
+        return listener
+
+    def _add_listeners(self):
+        """Add value listeners to all parameters whose string values need to
+           be provided by Ableton (if not done already).
+        """
+        if (self._listeners != None) or not USE_VALUE_LISTENERS:
+            return
+        self.debug(3,f'Adding { len(self._value_plan) } value listeners for device { self._device_name }')
+        self._listeners = []
+        for (index,entry) in enumerate(self._value_plan):
+            p = entry[0]
+            listener = self._make_value_listener(index)
+            p.add_value_listener(listener)
+            self._listeners.append((p,listener))
+
+    def disconnect(self):
+        """Remove all value listeners; call when this device controller is
+           no longer used.
+        """
+        if VALUE_STRING_CACHE_SIZE > 0:
+            self.debug(3,f'Value string cache for device { self._device_name }: { self._value_strings.stats() }')
+        if self._listeners == None:
+            return
+        # device may already be deleted (and its parameters with it)
+        if self._device:
+            self.debug(3,f'Removing value listeners for device { self._device_name }')
+            for (p,listener) in self._listeners:
+                if p.value_has_listener(listener):
+                    p.remove_value_listener(listener)
+        self._listeners = None
+        self._dirty = set()
 
     def build_midi_map(self, midi_map_handle):
         """Build a MIDI map for the device    
@@ -53,47 +175,114 @@ class GenericDeviceController(ElectraOneBase):
         self.debug(3,f'Building MIDI map for device { self._device_name }')
         # TODO/FIXME: not clear how this is honoured in the Live.MidiMap.map_midi_cc call
         needs_takeover = True
-        for p in self._parameters:
-            ccinfo = self._cc_map.get_cc_info(p)
-            if ccinfo.is_mapped():
-                if ccinfo.is_cc14():
-                    map_mode = Live.MidiMap.MapMode.absolute_14_bit
-                else:
-                    map_mode = Live.MidiMap.MapMode.absolute
-                cc_no = ccinfo.get_cc_no()
-                midi_channel = ccinfo.get_midi_channel()
-                self.debug(3,f'Mapping { p.original_name } ({p.name}) to CC { cc_no } on MIDI channel { midi_channel }')
-                # Ableton internally numbers MIDI channels 0..15
-                Live.MidiMap.map_midi_cc(midi_map_handle, p, midi_channel-1, cc_no, map_mode, not needs_takeover)
+        for (p, ccinfo, midi_channel, cc_no, is_cc14, control_tuple, value_items) in self._plan:
+            if is_cc14:
+                map_mode = Live.MidiMap.MapMode.absolute_14_bit
             else:
-                self.debug(3,f'{ p.original_name } ({p.name}) not mapped.')
+                map_mode = Live.MidiMap.MapMode.absolute
+            self.debug(3,f'Mapping { p.original_name } ({p.name}) to CC { cc_no } on MIDI channel { midi_channel }')
+            # Ableton internally numbers MIDI channels 0..15
+            Live.MidiMap.map_midi_cc(midi_map_handle, p, midi_channel-1, cc_no, map_mode, not needs_takeover)
 
-    def _refresh_parameter(self, p, ccinfo, force):
+    def _refresh_parameter(self, entry, force):
         """Update the displayed values for a single control on the E1. If force,
            MIDI CC is also updated, and possible string value update is always
            sent.
            (Assumes the device is visible!)
-           - p: parameter; Live.DeviceParameter.DeviceParameter
-           - ccinfo: information about the CC mapping; CCInfo
+           - entry: entry in the plan for the parameter (see _compile_plan); tuple
            - force: whether to always send the valuestr, or only if changed.
                Used to distinguish a state refresh from a value update; bool
         """
+        (p, ccinfo, midi_channel, cc_no, is_cc14, control_tuple, value_items) = entry
         # update MIDI value on the E1 if full refresh is requested
         if force:
             self.send_parameter_using_ccinfo(p,ccinfo)
         # update control with Ableton value string when mapped
         # as such, if forced or if the value changed since last update/refresh
-        control_tuple = ccinfo.get_control_id()
         (control_id,value_id) = control_tuple
         if (control_id != UNMAPPED_ID) and USE_ABLETON_VALUES:
-            pstr = str(p)
+            # for quantized parameters compare the index of the value item
+            # (and only look up the string when it must be sent)
+            if value_items:
+                pvalue = int(p.value)
+                if pvalue not in range(len(value_items)):
+                    pvalue = str(p)
+            else:
+                pvalue = self._value_string(p)
             # check whether sending the string value is really needed
             if force or \
                (control_tuple not in self._values) or \
-               (self._values[control_tuple] != pstr):
-                self._values[control_tuple] = pstr
+               (self._values[control_tuple] != pvalue):
+                self._values[control_tuple] = pvalue
+                pstr = value_items[pvalue] if type(pvalue) is int else pvalue
                 self.debug(4,f'Value of {p.original_name} ({p.name}) (of parameter {id(p)}) updated to {pstr}.')
-                self.send_value_update(control_id,value_id,pstr)
+                # (any value <= 0 means no maximum)
+                if force or (MAX_VALUE_UPDATES_PER_TICK <= 0):
+                    self._pending_values.pop(control_tuple,None)
+                    self._value_updates[control_tuple] = pstr
+                else:
+                    # keep only the newest value
+                    self._pending_values[control_tuple] = pstr
+
+    def set_visible_page(self, page):
+        """Record the page of the preset currently visible on the E1. If a
+           full refresh is still in progress, the parameters on this page are
+           refreshed immediately.
+           - page: the page id; int
+        """
+        self._visible_page = page
+        if len(self._background_refresh) > 0:
+            visible = [ entry for entry in self._background_refresh
+                        if self._entry_on_visible_page(entry) ]
+            self._background_refresh = [ entry for entry in self._background_refresh
+                                         if not self._entry_on_visible_page(entry) ]
+            self.debug(3,f'Refreshing page { page } of device { self._device_name } ({ len(visible) } parameters).')
+            for entry in visible:
+                self._refresh_parameter(entry,True)
+            self._flush_value_updates()
+
+    def _entry_on_visible_page(self, entry):
+        """Return whether the control for an entry in the plan is on the
+           visible page (or whether this is unknown).
+           - entry: entry in the plan (see _compile_plan); tuple
+           - result: bool
+        """
+        (p, ccinfo, midi_channel, cc_no, is_cc14, control_tuple, value_items) = entry
+        if (self._cc_pages != None) and ((midi_channel,cc_no) in self._cc_pages):
+            return self._cc_pages[(midi_channel,cc_no)] == self._visible_page
+        return self._on_visible_page(control_tuple)
+
+    def _on_visible_page(self, control_tuple):
+        """Return whether the control is on the visible page (or whether
+           this is unknown).
+           - control_tuple: the control id; tuple (int,int)
+           - result: bool
+        """
+        if self._control_pages == None:
+            return True
+        return self._control_pages.get(control_tuple[0]) == self._visible_page
+        
+    def _send_pending_values(self):
+        """Send at most MAX_VALUE_UPDATES_PER_TICK pending value updates to the
+           E1 (all if it is 0 or less), those for controls on the visible page
+           first. The rest remains pending for the next refresh.
+        """
+        if len(self._pending_values) == 0:
+            return
+        if MAX_VALUE_UPDATES_PER_TICK <= 0:
+            self._value_updates.update(self._pending_values)
+            self._pending_values.clear()
+            return
+        visible = [ c for c in self._pending_values if self._on_visible_page(c) ]
+        if len(visible) < MAX_VALUE_UPDATES_PER_TICK:
+            others = [ c for c in self._pending_values if not self._on_visible_page(c) ]
+            selected = visible + others[:MAX_VALUE_UPDATES_PER_TICK - len(visible)]
+        else:
+            selected = visible[:MAX_VALUE_UPDATES_PER_TICK]
+        for control_tuple in selected:
+            self._value_updates[control_tuple] = self._pending_values.pop(control_tuple)
+        if len(self._pending_values) > 0:
+            self.debug(4,f'{ len(self._pending_values) } value updates pending for device { self._device_name }.')
         
     def _refresh(self,full_refresh):
         """Refresh the state of the controls on the E1.
@@ -101,7 +290,7 @@ class GenericDeviceController(ElectraOneBase):
            If full_refresh, send MIDI CC updates for *all* parameters
            (brings MIDI info on E1 in sync with Ableton state) and update
            the string values for *all* controls whose string value must be
-           determined by Ableton.
+           determined by Ableton (see _full_refresh_steps).
 
            If not full_refresh, only update the string values for controls
            whose value changed since the last _refresh
@@ -112,29 +301,93 @@ class GenericDeviceController(ElectraOneBase):
              need to be refreshed too, and string value updates must always
              be sent; boolean
         """
+        if full_refresh:
+            for step in self._full_refresh_steps():
+                pass
+            return
         # device may already be deleted while this controller still exists
         if not self._device:
             return
         assert self._cc_map != None, 'No CC map present while refreshing device state.'
-        if full_refresh:
-            self.debug(3,f'Full state refresh for device { self._device_name }')
+        self.debug(6,f'Partial state refresh for device { self._device_name }')            
+        # only parameters with value strings need a partial refresh, and
+        # (when listening to value changes) only if they changed.
+        if self._listeners != None:
+            plan = [ self._value_plan[index] for index in sorted(self._dirty) ]
+            self._dirty = set()
         else:
-            self.debug(6,f'Partial state refresh for device { self._device_name }')            
-        for p in self._parameters:
-            ccinfo = self._cc_map.get_cc_info(p)
-            if ccinfo.is_mapped():
-                self._refresh_parameter(p,ccinfo,full_refresh)
+            plan = self._value_plan
+        for entry in plan:
+            self._refresh_parameter(entry,False)
+        self._send_pending_values()
+        self._continue_background_refresh()
+        self._flush_value_updates()
+
+    def _flush_value_updates(self):
+        """Send all collected value updates to the E1 (in as few messages as
+           possible, see send_value_updates).
+        """
+        if len(self._value_updates) > 0:
+            self.send_value_updates(self._value_updates)
+            self._value_updates = { }
+
+    def _full_refresh_steps(self):
+        """Generator performing a full refresh (see _refresh), refreshing
+           one parameter per step. Only refreshes the visible page; the
+           other pages are refreshed in the background (see update_display)
+           (Assumes the device is visible!)
+        """
+        # device may already be deleted while this controller still exists
+        if not self._device:
+            return
+        assert self._cc_map != None, 'No CC map present while refreshing device state.'
+        self.debug(3,f'Full state refresh for device { self._device_name }')
+        self._add_listeners()
+        self._dirty = set()
+        if BACKGROUND_REFRESH_PER_TICK < 0:
+            plan = self._plan
+            self._background_refresh = []
+        else:
+            plan = [ entry for entry in self._plan
+                     if self._entry_on_visible_page(entry) ]
+            self._background_refresh = [ entry for entry in self._plan
+                                         if not self._entry_on_visible_page(entry) ]
+        for entry in plan:
+            self._refresh_parameter(entry,True)
+            yield
+        self._flush_value_updates()
+
+    def _continue_background_refresh(self):
+        """Refresh the next BACKGROUND_REFRESH_PER_TICK parameters still to
+           be refreshed after a full refresh (see _refresh).
+        """
+        if len(self._background_refresh) == 0:
+            return
+        entries = self._background_refresh[:BACKGROUND_REFRESH_PER_TICK]
+        self._background_refresh = self._background_refresh[BACKGROUND_REFRESH_PER_TICK:]
+        for entry in entries:
+            self._refresh_parameter(entry,True)
+        self.debug(4,f'Background refresh of device { self._device_name }: { len(self._background_refresh) } parameters remaining.')
 
     def refresh_state(self):
         """Update both the MIDI CC values and the displayed values for the
            device on the E1. (Assumes the device is visible!)
         """
         self._refresh(True)
+
+    def refresh_state_steps(self):
+        """Return a generator that updates both the MIDI CC values and the
+           displayed values for the device on the E1 in small steps
+           (see RefreshJob). (Assumes the device is visible!)
+           - result: generator
+        """
+        return self._full_refresh_steps()
         
     def update_display(self):
         """Called every 100 ms; used to update values for controls
-           that want Ableton to set their value string. This way we do not
-           need to register value change listeners for every parameter.
+           that want Ableton to set their value string. When
+           USE_VALUE_LISTENERS, only parameters whose value changed are
+           updated; otherwise all such parameters are polled.
            (Assumes the device is visible!)
         """
         self._refresh(False)
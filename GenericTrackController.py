@@ -117,6 +117,8 @@ class GenericTrackController(ElectraOneBase):
         self._eq_cc_map = eq_cc_map
         # find the equaliser device on the track
         self._eq_device = self._my_channel_eq(eq_device_name)
+        if self._eq_device_controller:
+            self._eq_device_controller.disconnect()
         if self._eq_device:
             cc_map = self._my_channel_eq_cc_map(eq_cc_map)
             self._eq_device_controller = GenericDeviceController(self._c_instance, self._eq_device, cc_map)
@@ -212,6 +214,8 @@ class GenericTrackController(ElectraOneBase):
         """
         self._remove_listeners()
         self._property_controllers.disconnect()
+        if self._eq_device_controller:
+            self._eq_device_controller.disconnect()
 
     # --- Listeners
     
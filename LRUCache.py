@@ -0,0 +1,92 @@
+# LRUCache
+# - class implementing a small least recently used cache
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+
+# Python imports
+from collections import OrderedDict
+
+class LRUCache:
+    """A dictionary of bounded size; when full, the least recently used
+       entry is evicted. Keeps track of the number of cache hits and misses.
+    """
+
+    def __init__(self, size, on_evict=None):
+        """Create an empty cache.
+           - size: maximum number of entries; int (-1 means unbounded)
+           - on_evict: function called with the key and value of an entry
+             when it is evicted or removed (optional); function(key,value)
+        """
+        self._size = size
+        self._on_evict = on_evict
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the value cached for key (marking it as most recently
+           used), or default if not cached. Counts as a hit or a miss.
+           - key: key to look up; hashable
+           - default: value to return when not found
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        else:
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Cache value for key, evicting the least recently used entry if
+           the cache is full.
+           - key: key; hashable
+           - value: value to cache
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._entries[key] = value
+        if (self._size >= 0) and (len(self._entries) > self._size):
+            (old_key,old_value) = self._entries.popitem(last=False)
+            if self._on_evict:
+                self._on_evict(old_key,old_value)
+
+    def remove(self, key):
+        """Remove the entry for key from the cache (if present).
+           - key: key; hashable
+        """
+        if key in self._entries:
+            value = self._entries.pop(key)
+            if self._on_evict:
+                self._on_evict(key,value)
+
+    def clear(self):
+        """Remove all entries from the cache.
+        """
+        for key in list(self._entries.keys()):
+            self.remove(key)
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were a hit.
+           - result: hit rate; float (0..1)
+        """
+        lookups = self.hits + self.misses
+        return (self.hits / lookups) if lookups > 0 else 0.0
+
+    def stats(self):
+        """Return a human readable summary of the cache statistics
+           - result: str
+        """
+        return f'{len(self._entries)} entries, {self.hits} hits, {self.misses} misses ({100*self.hit_rate():.0f}% hit rate)'
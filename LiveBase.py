@@ -10,7 +10,11 @@
 # Distributed under the MIT License, see LICENSE
 #
 
-import Live
+try:
+    import Live
+except ImportError:
+    # running outside Live (see PresetCompiler.py)
+    Live = None
 
 # Python imports
 from pathlib import Path
@@ -51,11 +55,37 @@ class LiveBase(Log):
         """
         return LiveBase.REMOTE_SCRIPT_PATH / 'dumps'
 
+    def cachepath(self):
+        """Folder to cache presets constructed on the fly in
+           - result:  ; Path
+        """
+        return LiveBase.REMOTE_SCRIPT_PATH / 'cache'
+
+    def metadatapath(self):
+        """Folder to export device metadata to (see EXPORT_DEVICE_METADATA)
+           - result:  ; Path
+        """
+        return LiveBase.REMOTE_SCRIPT_PATH / 'metadata'
+
+    def allocationspath(self):
+        """Folder to store the CC allocation tables of devices in
+           (see STABLE_CC_ALLOCATION)
+           - result:  ; Path
+        """
+        return LiveBase.REMOTE_SCRIPT_PATH / 'allocations'
+
     def preloadedpath(self):
         """Folder to load predefined presets from
            - result:  ; Path
         """
         return LiveBase.REMOTE_SCRIPT_PATH / 'preloaded'
+
+    def preloadedarchivefname(self):
+        """Filename of the archive to load predefined presets from
+           (if it exists; see PresetArchive.py)
+           - result:  ; Path
+        """
+        return LiveBase.REMOTE_SCRIPT_PATH / 'preloaded.e1pa'
     
     def luascriptfname(self):
         """Filename to load default LUA script from
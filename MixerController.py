@@ -16,6 +16,7 @@ import Live
 # Local imports
 from .config import *
 from .ElectraOneBase import ElectraOneBase
+from .RefreshJob import RefreshJob
 from .TransportController import TransportController
 from .MasterController import MasterController
 from .ReturnController import ReturnController
@@ -32,6 +33,8 @@ class MixerController(ElectraOneBase):
            - c_instance: Live interface object (see __init.py__)
         """
         ElectraOneBase.__init__(self, c_instance)
+        # full refresh in progress (if not None)
+        self._refresh_job = None
         # mixer preset is assumed to be uploaded by the user in advance
         # (with configuration constants set accordingly)
         #
@@ -107,21 +110,56 @@ class MixerController(ElectraOneBase):
         """
         if self._slot_is_visible():
             self.debug(1,'MixCont refreshing state.')
-            self.midi_burst_on()
+            # a new refresh supersedes the one in progress
+            self._cancel_refresh()
+            self._refresh_job = RefreshJob('mixer', self._refresh_steps(), self.debug)
+            self._continue_refresh()
+        else:
+            self.debug(1,'MixCont not refreshing state (mixer not visible).')
+
+    def _refresh_steps(self):
+        """Generator performing a state refresh in steps (see RefreshJob);
+           the controllers are refreshed in the same order as before.
+        """
+        try:
             self._set_controls_visibility()
+            yield
             self._transport_controller.refresh_state()
+            yield
             self._master_controller.refresh_state()
+            yield
             # refresh tracks (this includes the clips in the
             # session control page)
             for track in self._track_controllers:
                 track.refresh_state()
+                yield
             # refresh return tracks
             for retrn in self._return_controllers:
                 retrn.refresh_state()
-            self.midi_burst_off()
+                yield
+        finally:
             self.debug(1,'MixCont state refreshed.')
-        else:
-            self.debug(1,'MixCont not refreshing state (mixer not visible).')
+
+    def _continue_refresh(self):
+        """Continue the refresh in progress (if any) within the time budget.
+           Burst mode is on only while the job runs, without waiting for
+           the E1 (so the main thread is not blocked).
+        """
+        if self._refresh_job:
+            self.midi_burst_on(wait=False)
+            try:
+                finished = self._refresh_job.run(REFRESH_TIME_BUDGET)
+            finally:
+                self.midi_burst_off(wait=False)
+            if finished:
+                self._refresh_job = None
+
+    def _cancel_refresh(self):
+        """Cancel the refresh in progress (if any).
+        """
+        if self._refresh_job:
+            self._refresh_job.cancel()
+            self._refresh_job = None
             
     def update_display(self,tick):
         """Update the dispay (called every 100ms).
@@ -129,6 +167,13 @@ class MixerController(ElectraOneBase):
            - tick: number of 100ms ticks since start (mod 1000)
         """
         self.debug(6,'MixCont update display.')
+        # Continue a full refresh in progress; update the display only when done
+        if self._refresh_job:
+            if self._slot_is_visible():
+                self._continue_refresh()
+            else:
+                self._cancel_refresh()
+            return
         if (tick % MIXER_TRACKS_REFRESH_PERIOD) == 0:
             self._check_visible_torcs_change()
         # forward update request to children
@@ -144,6 +189,7 @@ class MixerController(ElectraOneBase):
            Forwarded to the transport, master, return and track controllers.
         """
         self.debug(1,'MixCont disconnecting.')
+        self._cancel_refresh()
         self._remove_listeners()
         self._transport_controller.disconnect()        
         self._master_controller.disconnect()
@@ -178,6 +224,8 @@ class MixerController(ElectraOneBase):
            visible return tracks
            (unmap and destroy existing return track controllers)
         """
+        # a refresh in progress refers to the old controllers
+        self._cancel_refresh()
         for rtrn in self._return_controllers:
             rtrn.disconnect()
         return_count = min(MAX_NO_OF_SENDS, len(self.song().return_tracks))
@@ -191,6 +239,8 @@ class MixerController(ElectraOneBase):
 
            Assumes self._visible_torcs is up to date.
         """
+        # a refresh in progress refers to the old controllers
+        self._cancel_refresh()
         for tc in self._track_controllers:
             tc.disconnect()
         # make sure the first track index is still pointing to existing tracks
@@ -309,8 +359,10 @@ class MixerController(ElectraOneBase):
                 self._first_row_index -= 5
                 self.debug(4,f'First session row is {self._first_row_index} .')
                 self.midi_burst_on()
-                self._refresh_clips()
-                self.midi_burst_off()
+                try:
+                    self._refresh_clips()
+                finally:
+                    self.midi_burst_off()
             
     def _handle_page_down(self,value):
         """Move session slots one page down.
@@ -320,8 +372,10 @@ class MixerController(ElectraOneBase):
             self._first_row_index += 5
             self.debug(4,f'First session row is {self._first_row_index} .')
             self.midi_burst_on()
-            self._refresh_clips()
-            self.midi_burst_off()
+            try:
+                self._refresh_clips()
+            finally:
+                self.midi_burst_off()
             
     def _handle_session_clip_slot(self,value):
         """Trigger a session slot clip
@@ -0,0 +1,294 @@
+# PresetArchive
+# - Single file archive containing all predefined presets, their LUA scripts
+#   and their CC maps
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+#
+# Note: this module does not depend on Live (or any other module in this
+# package) so that it can also be run standalone to build an archive:
+#
+#   python3 PresetArchive.py <source> <archive> [--ccmaps <folder>] [--minify]
+#
+# where <source> is either the preloaded folder, or upload-to-E1.zip (in
+# which case the CC maps, that are not part of the zip file, are taken
+# from the folder specified by --ccmaps; default ./preloaded). With --minify
+# the presets are minified (see minify_preset) before they are archived,
+# and the savings per preset are reported.
+
+# Python imports
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+import zipfile
+from pathlib import Path
+
+# Archive layout (all integers little endian):
+# - header: magic (4 bytes), format version (uint16), number of entries (uint32)
+# - offset table: for each entry
+#     length of the name (uint16), name (UTF-8, NFC normalised),
+#     offset of the data from the start of the file (uint32),
+#     length of the data (uint32)
+# - the data of all entries, concatenated.
+# Entry names are the file names as they appear in the preloaded folder
+# (e.g. Echo.12.1.epr, Echo.12.1.lua, Echo.12.1.ccmap).
+ARCHIVE_MAGIC = b'E1PA'
+ARCHIVE_VERSION = 1
+
+_HEADER = struct.Struct('<4sHI')
+_NAME_LEN = struct.Struct('<H')
+_SPAN = struct.Struct('<II')
+
+# file types stored in an archive
+ARCHIVE_SUFFIXES = ('.epr', '.lua', '.ccmap')
+
+# folder inside upload-to-E1.zip that contains the presets
+ZIP_PRESET_FOLDER = 'presets/xot/ableton/'
+
+# line prepended to all LUA scripts in upload-to-E1.zip
+ZIP_LUA_REQUIRE = 'require("xot/default")'
+
+# Fields of an E1 preset that can be omitted when they have their default
+# value: for controls, and for the messages of their values. (The default
+# maximum of a message depends on its type.)
+_CONTROL_DEFAULTS = { 'visible': True, 'color': 'FFFFFF' }
+_MESSAGE_DEFAULTS = { 'min': 0, 'lsbFirst': False }
+_MESSAGE_MAX_DEFAULTS = { 'cc7': 127, 'cc14': 16383 }
+
+def _omit_defaults(obj, defaults):
+    """Remove the fields of an object that have their default value.
+       - obj: the object; dict
+       - defaults: default values of fields; dict
+    """
+    for (field,default) in defaults.items():
+        # (compare types as well, as True == 1 and False == 0)
+        if (field in obj) and (type(obj[field]) is type(default)) and \
+           (obj[field] == default):
+            del obj[field]
+
+def minify_preset(preset):
+    """Minify an E1 JSON preset: remove all whitespace, and omit fields of
+       controls and their messages that have their default value.
+       - preset: the preset; str or bytes
+       - result: the minified preset; str
+    """
+    data = json.loads(preset)
+    for control in data.get('controls',[]):
+        _omit_defaults(control,_CONTROL_DEFAULTS)
+        for value in control.get('values',[]):
+            message = value.get('message')
+            if isinstance(message,dict):
+                _omit_defaults(message,_MESSAGE_DEFAULTS)
+                if message.get('type') in _MESSAGE_MAX_DEFAULTS:
+                    _omit_defaults(message,{ 'max': _MESSAGE_MAX_DEFAULTS[message['type']] })
+    return json.dumps(data, separators=(',',':'), ensure_ascii=False)
+
+def _normalise(name):
+    """Normalise a file name (Mac uses a different encoding for UTF); see
+       Devices.py.
+       - name: file name; str
+       - result: NFC normalised name; str
+    """
+    return unicodedata.normalize('NFC',name)
+
+
+class PresetArchive:
+    """Read only access to a preset archive. The archive is memory mapped
+       and the data for an entry is only sliced out when requested.
+    """
+
+    def __init__(self, path):
+        """Open and memory map the archive and read its offset table.
+           - path: path to the archive; Path
+        """
+        self._path = path
+        # dictionary of entries: { name: (offset,length) }
+        self._index = {}
+        self._file = open(path,'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        assert size >= _HEADER.size, f'Preset archive {path} is truncated.'
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic,version,count) = _HEADER.unpack_from(self._mmap, 0)
+        assert magic == ARCHIVE_MAGIC, f'{path} is not a preset archive.'
+        assert version == ARCHIVE_VERSION, f'Preset archive {path} has unsupported version {version}.'
+        pos = _HEADER.size
+        for i in range(count):
+            (name_len,) = _NAME_LEN.unpack_from(self._mmap, pos)
+            pos += _NAME_LEN.size
+            name = self._mmap[pos:pos+name_len].decode('utf-8')
+            pos += name_len
+            (offset,length) = _SPAN.unpack_from(self._mmap, pos)
+            pos += _SPAN.size
+            assert offset + length <= size, f'Entry {name} exceeds preset archive {path}.'
+            self._index[name] = (offset,length)
+
+    def names(self):
+        """Return the names of all entries in the archive
+           - result: names; iterable of str
+        """
+        return self._index.keys()
+
+    def contains(self, name):
+        """Return whether the archive contains an entry
+           - name: name of the entry; str
+           - result: bool
+        """
+        return name in self._index
+
+    def read_bytes(self, name):
+        """Return the data stored for an entry, or None if not present.
+           - name: name of the entry; str
+           - result: data; bytes
+        """
+        if name not in self._index:
+            return None
+        (offset,length) = self._index[name]
+        return self._mmap[offset:offset+length]
+
+    def read(self, name):
+        """Return the data stored for an entry as a string, or None if not present.
+           - name: name of the entry; str
+           - result: data; str
+        """
+        data = self.read_bytes(name)
+        if data == None:
+            return None
+        return data.decode('utf-8')
+
+    def close(self):
+        """Close the archive
+        """
+        self._mmap.close()
+        self._file.close()
+
+# --- building an archive
+
+def write_archive(entries, path):
+    """Write a preset archive.
+       - entries: dictionary of entry names and their data; { str: bytes }
+       - path: path of the archive to write; Path
+    """
+    names = sorted(entries.keys())
+    encoded_names = [ _normalise(name).encode('utf-8') for name in names ]
+    # compute where the data starts
+    offset = _HEADER.size
+    for encoded_name in encoded_names:
+        offset += _NAME_LEN.size + len(encoded_name) + _SPAN.size
+    table = bytearray(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(names)))
+    for (name,encoded_name) in zip(names,encoded_names):
+        length = len(entries[name])
+        table += _NAME_LEN.pack(len(encoded_name))
+        table += encoded_name
+        table += _SPAN.pack(offset,length)
+        offset += length
+    # write to a temporary file first, so a running remote script never
+    # sees a half written archive
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path,'wb') as f:
+        f.write(table)
+        for name in names:
+            f.write(entries[name])
+    os.replace(tmp_path,path)
+
+def entries_from_folder(folder):
+    """Collect all presets, LUA scripts and CC maps in a folder.
+       - folder: folder to scan; Path
+       - result: dictionary of entry names and their data; { str: bytes }
+    """
+    entries = {}
+    for path in Path(folder).iterdir():
+        if path.suffix in ARCHIVE_SUFFIXES:
+            entries[_normalise(path.name)] = path.read_bytes()
+    return entries
+
+def entries_from_zip(zipfname, ccmap_folder):
+    """Collect all presets and LUA scripts from a zip file in the
+       upload-to-E1.zip format, and the matching CC maps from a folder.
+       LUA scripts in the zip file require the default LUA script on the E1;
+       this line is removed again (as Devices adds the default LUA script
+       itself).
+       - zipfname: the zip file; Path
+       - ccmap_folder: folder to take the CC maps from; Path
+       - result: dictionary of entry names and their data; { str: bytes }
+    """
+    entries = {}
+    with zipfile.ZipFile(zipfname) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.startswith(ZIP_PRESET_FOLDER):
+                continue
+            name = _normalise(info.filename[len(ZIP_PRESET_FOLDER):])
+            suffix = Path(name).suffix
+            if ('/' in name) or (suffix not in ARCHIVE_SUFFIXES):
+                continue
+            data = zf.read(info)
+            if suffix == '.lua':
+                lines = data.decode('utf-8').splitlines(keepends=True)
+                if (len(lines) > 0) and (lines[0].strip() == ZIP_LUA_REQUIRE):
+                    lines = lines[1:]
+                data = ''.join(lines).encode('utf-8')
+                # Devices treats an empty LUA script and a missing one the same
+                if len(data) == 0:
+                    continue
+            entries[name] = data
+    # add the CC maps for all presets found
+    for name in list(entries.keys()):
+        if name.endswith('.epr'):
+            ccmap_name = name[:-len('.epr')] + '.ccmap'
+            if ccmap_name not in entries:
+                ccmap_path = Path(ccmap_folder) / ccmap_name
+                if ccmap_path.exists():
+                    entries[ccmap_name] = ccmap_path.read_bytes()
+                else:
+                    print(f'Warning: no CC map found for {name}; skipped.', file=sys.stderr)
+                    del entries[name]
+    return entries
+
+def minify_entries(entries):
+    """Minify all presets in a collection of entries (see minify_preset)
+       and report the savings for each preset.
+       - entries: dictionary of entry names and their data; { str: bytes }
+    """
+    total_before = 0
+    total_after = 0
+    for name in sorted(entries.keys()):
+        if name.endswith('.epr'):
+            before = len(entries[name])
+            entries[name] = minify_preset(entries[name]).encode('utf-8')
+            after = len(entries[name])
+            print(f'{name}: {before} -> {after} bytes ({before-after} saved).')
+            total_before += before
+            total_after += after
+    if total_before > 0:
+        print(f'Minified presets: {total_before} -> {total_after} bytes ({100*(total_before-total_after)/total_before:.1f}% saved).')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a preset archive for the ElectraOne remote script.')
+    parser.add_argument('source', type=Path, help='preloaded folder, or upload-to-E1.zip')
+    parser.add_argument('archive', type=Path, help='archive to create (e.g. preloaded.e1pa)')
+    parser.add_argument('--ccmaps', type=Path, default=Path(__file__).parent / 'preloaded',
+                        help='folder with CC maps (when building from a zip file)')
+    parser.add_argument('--minify', action='store_true',
+                        help='minify the presets, and report the savings')
+    args = parser.parse_args(argv)
+    if args.source.is_dir():
+        entries = entries_from_folder(args.source)
+    else:
+        entries = entries_from_zip(args.source, args.ccmaps)
+    if args.minify:
+        minify_entries(entries)
+    write_archive(entries, args.archive)
+    presets = [ name for name in entries if name.endswith('.epr') ]
+    size = sum( len(data) for data in entries.values() )
+    print(f'Archived {len(presets)} presets ({len(entries)} files, {size} bytes) in {args.archive}.')
+
+if __name__ == '__main__':
+    main()
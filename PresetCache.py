@@ -0,0 +1,175 @@
+# PresetCache
+# - class to cache presets constructed on the fly, in memory and on disk
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+
+# Python imports
+import hashlib
+import json
+import os
+import sys
+
+# Ableton Live imports
+from _Generic.Devices import DEVICE_DICT
+
+# Local imports
+from .config import *
+from .ElectraOneBase import ElectraOneBase
+from .LRUCache import LRUCache
+from .PresetInfo import PresetInfo
+from .CCInfo import CCMap
+from .UniqueParameters import device_parameters_fingerprint
+
+# Version of the cache format (and of the way presets are constructed);
+# increment to invalidate all presets cached on disk
+CACHE_VERSION = 3
+
+class PresetCache(ElectraOneBase):
+    """Cache of presets constructed on the fly by ElectraOneDumper.
+       Recently used presets are kept in memory, all presets are stored
+       on disk (in the cache folder). Presets are indexed by a fingerprint
+       of the device parameters and the configuration constants that
+       influence the construction of the preset.
+    """
+
+    def __init__(self, c_instance):
+        """Create an empty cache (in memory; presets already in the disk
+           cache are loaded when needed)
+           - c_instance: Live interface object (see __init.py__)
+        """
+        ElectraOneBase.__init__(self, c_instance)
+        # { fingerprint: PresetInfo }
+        self._presets = LRUCache(GENERATED_PRESET_CACHE_SIZE)
+
+    def _fingerprint(self, device, device_name, names, group, parameters_fingerprint):
+        """Return the fingerprint for the preset constructed for a device.
+           - device: the device; Live.Device.Device
+           - device_name: name of the device (or template); str
+           - names: whether the names of the parameters count; bool
+           - group: index of the group of the preset; int
+           - parameters_fingerprint: fingerprint of the device parameters
+             (see device_parameters_fingerprint; computed if None); str
+           - result: fingerprint; str
+        """
+        config = ( CACHE_VERSION, device_name, group, USE_PAGE_GROUPS, ORDER, MIDI_EFFECT_CHANNEL
+                 , MAX_MIDI_EFFECT_CHANNELS, MAX_CC7_PARAMETERS, MAX_CC14_PARAMETERS
+                 , STABLE_CC_ALLOCATION, PRESET_COLOR, COMPACT_PRESETS, device_name in BORKED_DEVICES
+                 , PARAMETERS_TO_IGNORE.get("ALL"), PARAMETERS_TO_IGNORE.get(device_name)
+                 , PERSONAL_DEVICE_DICT.get(device_name), DEVICE_DICT.get(device_name)
+                 )
+        h = hashlib.sha1(repr(config).encode('utf-8'))
+        if parameters_fingerprint == None:
+            parameters_fingerprint = device_parameters_fingerprint(device, names)
+        h.update(parameters_fingerprint.encode('ascii'))
+        return h.hexdigest()
+
+    def _cache_fname(self, fingerprint):
+        """Return the name of the file in the disk cache for a fingerprint
+           - fingerprint: the fingerprint; str
+           - result: ; Path
+        """
+        return self.cachepath() / f'{ fingerprint }.json'
+
+    def _load(self, fingerprint):
+        """Load a preset from the disk cache.
+           - fingerprint: the fingerprint; str
+           - result: the preset (None if not found); PresetInfo
+        """
+        fname = self._cache_fname(fingerprint)
+        if not os.path.exists(fname):
+            return None
+        try:
+            with open(fname,'r') as f:
+                entry = json.load(f)
+            # mark as recently used (see _prune)
+            os.utime(fname)
+            # (store the preset as ASCII bytes, like ElectraOneDumper does,
+            # so it can be uploaded as is)
+            return PresetInfo(entry['preset'].encode('ascii'), entry['lua'], CCMap(entry['ccmap']), group_count=entry['group_count'])
+        except:
+            self.warning(f'Failed to load cached preset {fname}: {sys.exc_info()[1]}')
+            return None
+
+    def _save(self, fingerprint, preset_info):
+        """Save a preset in the disk cache.
+           - fingerprint: the fingerprint; str
+           - preset_info: the preset; PresetInfo
+        """
+        fname = self._cache_fname(fingerprint)
+        preset = preset_info.get_preset()
+        if type(preset) is bytes:
+            preset = preset.decode('ascii')
+        entry = { 'preset': preset
+                , 'lua': preset_info.get_lua_script()
+                , 'ccmap': repr(dict(preset_info.get_cc_map()))
+                , 'group_count': preset_info.get_group_count()
+                }
+        try:
+            os.makedirs(self.cachepath(), exist_ok=True)
+            # write to a temporary file first, so a half written file is
+            # never read back
+            tmp_fname = str(fname) + '.tmp'
+            with open(tmp_fname,'w') as f:
+                json.dump(entry,f)
+            os.replace(tmp_fname,fname)
+        except:
+            self.warning(f'Failed to save preset in cache {fname}: {sys.exc_info()[1]}')
+            return
+        self._prune()
+
+    def _prune(self):
+        """Remove the least recently used presets from the disk cache when
+           it holds more than PRESET_DISK_CACHE_SIZE presets.
+        """
+        if PRESET_DISK_CACHE_SIZE < 0:
+            return
+        try:
+            with os.scandir(self.cachepath()) as entries:
+                files = [ (entry.stat().st_mtime, entry.path) for entry in entries
+                          if entry.name.endswith('.json') ]
+            if len(files) <= PRESET_DISK_CACHE_SIZE:
+                return
+            files.sort()
+            for (mtime,fname) in files[:len(files) - PRESET_DISK_CACHE_SIZE]:
+                self.debug(4,f'Removing {fname} from disk cache.')
+                os.remove(fname)
+        except:
+            self.warning(f'Failed to prune disk cache: {sys.exc_info()[1]}')
+
+    def get(self, device, device_name, names=True, group=0, parameters_fingerprint=None):
+        """Return the cached preset for a device (if any).
+           - device: the device; Live.Device.Device
+           - device_name: name of the device (or template); str
+           - names: whether the names of the parameters count (False for
+             templates, whose labels are set separately); bool
+           - group: index of the group of pages (see ElectraOneDumper); int
+           - parameters_fingerprint: fingerprint of the device parameters,
+             if already computed by the caller (must match names; see
+             device_parameters_fingerprint); str
+           - result: the preset and its fingerprint (preset None if not
+             cached); (PresetInfo,str)
+        """
+        fingerprint = self._fingerprint(device, device_name, names, group, parameters_fingerprint)
+        preset_info = self._presets.get(fingerprint)
+        if (preset_info == None) and USE_PRESET_DISK_CACHE:
+            preset_info = self._load(fingerprint)
+            if preset_info != None:
+                self.debug(3,f'Preset for {device_name} loaded from disk cache.')
+                self._presets.put(fingerprint,preset_info)
+        self.debug(4,f'Generated preset cache: { self._presets.stats() }')
+        return (preset_info,fingerprint)
+
+    def put(self, fingerprint, preset_info):
+        """Cache a preset constructed for a device.
+           - fingerprint: fingerprint of the device (as returned by get); str
+           - preset_info: the preset; PresetInfo
+        """
+        self._presets.put(fingerprint,preset_info)
+        if USE_PRESET_DISK_CACHE:
+            self._save(fingerprint,preset_info)
@@ -0,0 +1,130 @@
+# PresetCompiler
+# - construct presets outside Live, from exported device metadata
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+#
+# Runs ElectraOneDumper (with the current configuration) on device metadata
+# exported by the remote script (see EXPORT_DEVICE_METADATA and
+# DeviceMetadata.py), in parallel for all devices. Live is not needed.
+# Usage:
+#
+#   python3 PresetCompiler.py <metadata> [<metadata> ...] [--output <folder>] [--jobs <n>]
+#
+# where every <metadata> is an exported metadata file, or a folder of them
+# (e.g. ./metadata). For every device the preset, LUA script and CC map are
+# written to the output folder (default ./dumps), like DUMP does; for
+# devices split into groups of pages (see USE_PAGE_GROUPS) a preset is
+# written for every group. The time to construct and the size of every
+# preset is reported.
+
+# Python imports
+import argparse
+import concurrent.futures
+import importlib
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+# Name of the package the modules of the remote script are imported from
+PACKAGE = __package__ or 'ElectraOne'
+
+if PACKAGE not in sys.modules:
+    # run as a script: make the modules of the remote script importable
+    # without running its __init__.py (which needs Live)
+    _package = types.ModuleType(PACKAGE)
+    _package.__path__ = [str(Path(__file__).resolve().parent)]
+    sys.modules[PACKAGE] = _package
+
+def compile_device(fname, output):
+    """Construct the preset(s) for the device whose metadata is in fname,
+       and write them to the output folder.
+       - fname: the metadata file; str
+       - output: folder to write the presets to; str
+       - result: name and size of every preset written, warnings logged,
+         and the time taken (in seconds); ([(str,int)],[str],float)
+    """
+    dumper_module = importlib.import_module(f'{PACKAGE}.ElectraOneDumper')
+    metadata_module = importlib.import_module(f'{PACKAGE}.DeviceMetadata')
+    start = time.perf_counter()
+    device = metadata_module.load_device_metadata(fname)
+    device_name = device.device_name
+    # (outside Live DEVICE_DICT is empty; use the banks exported with the device)
+    if device.banks and (device_name not in dumper_module.DEVICE_DICT):
+        dumper_module.DEVICE_DICT[device_name] = device.banks
+    c_instance = metadata_module.OfflineInstance()
+    presets = []
+    group = 0
+    group_count = 1
+    while group < group_count:
+        dumper = dumper_module.ElectraOneDumper(c_instance, device, group=group, device_name=device_name)
+        preset_info = dumper.get_preset_info()
+        group_count = preset_info.get_group_count()
+        # (named like EffectController names presets for groups)
+        name = device_name if group == 0 else f'{device_name}-{group+1}'
+        preset_info.dump(device, name, output, dumper.debug)
+        presets.append((name, len(preset_info.get_preset())))
+        group += 1
+    warnings = [m for m in c_instance.messages if m.startswith('E1 (warning)')]
+    return (presets, warnings, time.perf_counter() - start)
+
+def metadata_files(sources):
+    """Return the metadata files to compile.
+       - sources: metadata files or folders containing them; [Path]
+       - result: ; [str]
+    """
+    fnames = []
+    for source in sources:
+        if source.is_dir():
+            fnames += sorted(str(f) for f in source.glob('*.json'))
+        else:
+            fnames.append(str(source))
+    return fnames
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Construct presets for the ElectraOne remote script from exported device metadata.')
+    parser.add_argument('metadata', type=Path, nargs='+', help='metadata files, or folders containing them')
+    parser.add_argument('--output', type=Path, default=Path(__file__).resolve().parent / 'dumps',
+                        help='folder to write the presets to (default ./dumps)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='number of processes (default: number of CPUs)')
+    args = parser.parse_args(argv)
+    fnames = metadata_files(args.metadata)
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    if args.jobs == 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs)
+    failed = 0
+    total = 0
+    with executor:
+        futures = { executor.submit(compile_device, fname, str(args.output)): fname for fname in fnames }
+        for future in concurrent.futures.as_completed(futures):
+            fname = futures[future]
+            try:
+                (presets, warnings, elapsed) = future.result()
+            except Exception as e:
+                print(f'{fname}: failed: {e!r}', file=sys.stderr)
+                failed += 1
+                continue
+            for m in warnings:
+                print(f'{fname}: {m.strip()}', file=sys.stderr)
+            for (name, size) in presets:
+                print(f'{name}: {size} bytes ({1000*elapsed/len(presets):.1f} ms).')
+            total += len(presets)
+    print(f'Compiled {total} presets from {len(fnames)-failed} devices in {time.perf_counter()-start:.2f} s in {args.output}.')
+    if failed > 0:
+        print(f'{failed} devices failed.', file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
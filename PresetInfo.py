@@ -9,21 +9,92 @@
 #
 # Distributed under the MIT License, see LICENSE
 
+# Python imports
+import json
+import zlib
+
+# Local imports
+from .config import PRESET_CACHE_SIZE
+from .LRUCache import LRUCache
 from .UniqueParameters import make_device_parameters_unique
 
+def write_if_changed(fname, contents):
+    """Write contents to a file, unless the file already has these contents.
+       - fname: name of the file; str
+       - contents: ; bytes
+       - result: whether the file was written; bool
+    """
+    try:
+        with open(fname,'rb') as f:
+            if f.read() == contents:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(fname,'wb') as f:
+        f.write(contents)
+    return True
+
 class PresetInfo:
     """ Class containing an E1 JSON preset,a LUA scripty and the
         associated CC-map
-      - The preset is a JSON string in Electra One format.
+      - The preset is a JSON string in Electra One format (either a str, or
+        ASCII bytes as constructed by ElectraOneDumper; the latter can be
+        uploaded as is).
       - The LUA script is (a possibly empty) string.
       - The MIDI cc mapping data is a CCMap (see CCInfo)
+      The preset and the LUA script can optionally be stored compressed;
+      they are then decompressed on first use and kept in a small cache
+      (shared by all PresetInfo objects) of recently used presets.
     """
+
+    # cache of decompressed (preset, LUA script) pairs, indexed by PresetInfo
+    _cache = LRUCache(PRESET_CACHE_SIZE)
     
-    def __init__(self,json_preset,lua_script,cc_map):
-        self._json_preset = json_preset
-        self._lua_script = lua_script
+    def __init__(self,json_preset,lua_script,cc_map,compress=False,group_count=1):
+        """Create the preset info
+           - json_preset: the preset; str or bytes (ASCII)
+           - lua_script: the LUA script; str
+           - cc_map: the CC map; CCMap
+           - compress: whether to store preset and LUA script compressed; bool
+           - group_count: number of groups the device is split into if
+             the preset is for one group of its parameters (see
+             ElectraOneDumper); int
+        """
+        self._compressed = compress
+        if compress:
+            if type(json_preset) is not bytes:
+                json_preset = json_preset.encode('utf-8')
+            self._json_preset = zlib.compress(json_preset)
+            self._lua_script = zlib.compress(lua_script.encode('utf-8'))
+        else:
+            self._json_preset = json_preset
+            self._lua_script = lua_script
         self._cc_map = cc_map
+        self._group_count = group_count
+        # page of each control, and of each CC, in the preset (computed
+        # when first needed)
+        self._control_pages = None
+        self._cc_pages = None
+        self._cc_controls = None
+
+    @staticmethod
+    def cache_stats():
+        """Return the hit/miss statistics of the cache of decompressed presets
+           - result: str
+        """
+        return PresetInfo._cache.stats()
 
+    def _decompressed(self):
+        """Return the decompressed preset and LUA script (using the cache)
+           - result: preset and LUA script; (str,str)
+        """
+        pair = PresetInfo._cache.get(self)
+        if pair == None:
+            pair = ( zlib.decompress(self._json_preset).decode('utf-8')
+                   , zlib.decompress(self._lua_script).decode('utf-8') )
+            PresetInfo._cache.put(self,pair)
+        return pair
+    
     def get_cc_map(self):
         """Return the CC map
            - result: the CC map; CCMap
@@ -31,60 +102,126 @@ class PresetInfo:
         assert self._cc_map != None, 'Empty cc-map.'
         return self._cc_map
     
+    def get_group_count(self):
+        """Return the number of groups the device is split into (1 if the
+           preset contains all parameters).
+           - result: number of groups; int
+        """
+        return self._group_count
+
     def get_preset(self):
-        """Return the JSON preset as a string
-           - result: preset; str
+        """Return the JSON preset as a string (or as ASCII bytes, if
+           constructed by ElectraOneDumper and not compressed)
+           - result: preset; str or bytes
         """
         assert self._json_preset != None, 'Empty JSON preset.'
+        if self._compressed:
+            return self._decompressed()[0]
         return self._json_preset
 
+    def _compute_pages(self):
+        """Determine the page of each control, and of each CC, in the preset.
+           (And the control each CC belongs to.)
+        """
+        preset = json.loads(self.get_preset())
+        channels = { device['id']: device['channel']
+                     for device in preset.get('devices',[])
+                     if ('id' in device) and ('channel' in device) }
+        self._control_pages = {}
+        self._cc_pages = {}
+        self._cc_controls = {}
+        for control in preset.get('controls',[]):
+            if 'pageId' not in control:
+                continue
+            page = control['pageId']
+            if 'id' in control:
+                self._control_pages[control['id']] = page
+            for value in control.get('values',[]):
+                message = value.get('message',{})
+                if (message.get('deviceId') in channels) and \
+                   ('parameterNumber' in message):
+                    channel = channels[message['deviceId']]
+                    self._cc_pages[(channel,message['parameterNumber'])] = page
+                    if 'id' in control:
+                        self._cc_controls[(channel,message['parameterNumber'])] = control['id']
+        
+    def get_control_pages(self):
+        """Return the page each control in the preset is on.
+           - result: dictionary mapping control ids to page ids; { int: int }
+        """
+        if self._control_pages == None:
+            self._compute_pages()
+        return self._control_pages
+
+    def get_cc_pages(self):
+        """Return the page each CC in the preset is on.
+           - result: dictionary mapping (MIDI channel, CC no) to page ids;
+             { (int,int): int }
+        """
+        if self._cc_pages == None:
+            self._compute_pages()
+        return self._cc_pages
+
+    def get_cc_controls(self):
+        """Return the control each CC in the preset belongs to.
+           - result: dictionary mapping (MIDI channel, CC no) to control ids;
+             { (int,int): int }
+        """
+        if self._cc_controls == None:
+            self._compute_pages()
+        return self._cc_controls
+
     def get_lua_script(self):
         """Return the LUA script as a string
            - result: lua_script; str
         """
         assert self._lua_script != None, 'Empty LUA script.'
+        if self._compressed:
+            return self._decompressed()[1]
         return self._lua_script
 
+    def dump_contents(self, device, device_name, path):
+        """Return the files to dump for this device (see dump()), and
+           their contents.
+           - device: device to dump; Live.Devices
+           - device_name: name of device to dump; str
+           - path: path to dump into, str
+           - result: list of file names and their contents; [(str,bytes)]
+        """
+        # (Note: we need to pass device to have access to ALL parameters in
+        # the device, not only the ones in the ccmap.)
+        files = []
+        # the preset JSON string 
+        s = self.get_preset()
+        files.append((f'{ path }/{ device_name }.epr', s if type(s) is bytes else s.encode('utf-8')))
+        # the LUA script
+        files.append((f'{ path }/{ device_name }.lua', self.get_lua_script().encode('utf-8')))
+        # the cc-map
+        ccmap = self.get_cc_map()
+        entries = []
+        for p in make_device_parameters_unique(device):
+            ccinfo = ccmap.get_cc_info(p)
+            if ccinfo.is_mapped():
+                entries.append(f"'{ p.original_name }': { ccinfo }\n")
+            else:
+                entries.append(f"'{ p.original_name }': None\n")
+        files.append((f'{ path }/{ device_name }.ccmap', ('{' + ','.join(entries) + '}').encode('utf-8')))
+        return files
+
     def dump(self, device, device_name, path, debug):
         """Dump the preset info for this device:
            the E1 JSON preset in <path>/<devicename>.epr
            the LUA script in <path>/<devicename>.lua        
            the CCmap in <path>/<devicename>.ccmap
+           Files whose contents did not change are not rewritten.
            - device: device to dump; Live.Devices
            - device_name: name of device to dump; str
            - path: path to dump into, str
            - debug: function to log debugging ino
         """
-        # (Note: we need to pass device to have access to ALL parameters in
-        # the device, not only the ones in the ccmap.)
         debug(2,f'Dumping device: { device_name } in { path }.')
-        # dump the preset JSON string 
-        fname = f'{ path }/{ device_name }.epr'
-        s = self.get_preset()
-        with open(fname,'w') as f:            
-            f.write(s)
-        # dump the LUA script
-        fname = f'{ path }/{ device_name }.lua'
-        s = self.get_lua_script()
-        with open(fname,'w') as f:            
-            f.write(s)
-        # dump the cc-map
-        fname = f'{ path }/{ device_name }.ccmap'
-        ccmap = self.get_cc_map()
-        with open(fname,'w') as f:
-            f.write('{')
-            comma = False # concatenate list items with a comma; don't write a comma before the first list entry
-            device_parameters = make_device_parameters_unique(device)
-            for p in device_parameters:
-                if comma:
-                    f.write(',')
-                comma = True
-                ccinfo = ccmap.get_cc_info(p)
-                if ccinfo.is_mapped():
-                    f.write(f"'{ p.original_name }': { ccinfo }\n")
-                else:
-                    f.write(f"'{ p.original_name }': None\n")
-            f.write('}')
+        for (fname,contents) in self.dump_contents(device, device_name, path):
+            write_if_changed(fname,contents)
         
     def validate(self, device, device_name, warning):
         """Check for internal consistency of PresetInfo and warn for
@@ -0,0 +1,76 @@
+# RefreshJob
+# - class to run a (full) state refresh in small steps spread over several
+#   calls to update_display
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+
+# Python imports
+import time
+
+class RefreshJob:
+    """A resumable refresh job. The job is defined by a generator that
+       performs one step of the refresh between every two yields. Calling
+       run() performs steps until the time budget is used up; the job is
+       finished when the generator is exhausted. Any cleanup the generator
+       needs should be done in a finally clause: it is also executed when
+       the job is cancelled. (Callers switch MIDI burst mode on only for
+       the duration of each run(), see midi_burst_on.)
+    """
+
+    def __init__(self, name, steps, debug):
+        """Create a new refresh job.
+           - name: name of the job (for debugging); str
+           - steps: generator performing the refresh steps; generator
+           - debug: function to log debugging info
+        """
+        self._name = name
+        self._steps = steps
+        self._debug = debug
+        self._step_count = 0
+        self._start = time.perf_counter()
+
+    def is_running(self):
+        """Return whether the job is still running
+           - result: bool
+        """
+        return self._steps != None
+
+    def run(self, budget):
+        """Run the job for (approximately) the time budget: steps are
+           performed until the budget is exceeded, so at least one step is
+           always performed.
+           - budget: time budget in seconds (-1 means: run to completion); float
+           - result: whether the job is finished; bool
+        """
+        if self._steps == None:
+            return True
+        deadline = time.perf_counter() + budget
+        try:
+            while True:
+                next(self._steps)
+                self._step_count += 1
+                if (budget >= 0) and (time.perf_counter() >= deadline):
+                    return False
+        except StopIteration:
+            self._steps = None
+            self._debug(3,f'Refresh job {self._name} finished ({self._step_count} steps, {1000*(time.perf_counter()-self._start):.0f} ms).')
+            return True
+        except:
+            # job cannot be resumed
+            self._steps = None
+            raise
+
+    def cancel(self):
+        """Cancel the job (if still running), running any cleanup code of
+           the generator.
+        """
+        if self._steps != None:
+            self._debug(3,f'Refresh job {self._name} cancelled after {self._step_count} steps.')
+            self._steps.close()
+            self._steps = None
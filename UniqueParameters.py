@@ -9,9 +9,20 @@
 #
 # Distributed under the MIT License, see LICENSE
 
-import Live
+# Python imports
+import hashlib
 
-class UniqueParameter(Live.DeviceParameter.DeviceParameter):
+try:
+    import Live
+except ImportError:
+    # running outside Live (see PresetCompiler.py)
+    Live = None
+
+# Local imports
+from .config import UNIQUE_PARAMETERS_CACHE_SIZE
+from .LRUCache import LRUCache
+
+class UniqueParameter(Live.DeviceParameter.DeviceParameter if Live else object):
     """Class extending Live's original parameter to redefine original_name
        and name. These are 'Monkeypatched' using get_unique_parameters_for_device
        See: https://stackoverflow.com/questions/31590152/monkey-patching-a-property
@@ -24,7 +35,89 @@ class UniqueParameter(Live.DeviceParameter.DeviceParameter):
     original_name = ""
     name = ""
     
+def _remove_parameters_listener(ptr, cache_entry):
+    """Remove the parameters listener of a device when its entry is evicted
+       from the cache.
+       - ptr: the device's _live_ptr; int
+       - cache_entry: (device, parameters, listener)
+    """
+    (device, parameters, listener) = cache_entry
+    # device may already be deleted
+    if device and device.parameters_has_listener(listener):
+        device.remove_parameters_listener(listener)
+
+# cache of unique parameter lists, indexed by device._live_ptr;
+# entries are (device, list of parameters or None if invalidated, listener)
+_unique_parameters = LRUCache(UNIQUE_PARAMETERS_CACHE_SIZE, _remove_parameters_listener)
+
+def _make_parameters_listener(ptr):
+    """Return a listener that invalidates the cached unique parameter list
+       of a device when its parameters change.
+       - ptr: the device's _live_ptr; int
+       - result: the listener; function
+    """
+    def listener():
+        if ptr in _unique_parameters:
+            (device, parameters, listener) = _unique_parameters.get(ptr)
+            _unique_parameters.put(ptr,(device, None, listener))
+    return listener
+
 def make_device_parameters_unique(device):
+    """Return the list device.parameters, in the same order, but making
+       original_name and name unique.
+       The list is cached per device (until its parameters change), except
+       for racks (whose macro names can be changed by the user at any time).
+       - device: Live.Device
+       result: list of parameters; [UniqueParameter]
+    """
+    if (UNIQUE_PARAMETERS_CACHE_SIZE == 0) or device.can_have_chains:
+        return _make_device_parameters_unique(device)
+    ptr = device._live_ptr
+    cache_entry = _unique_parameters.get(ptr)
+    # (the _live_ptr of a deleted device may be reused)
+    if (cache_entry != None) and not cache_entry[0]:
+        _unique_parameters.remove(ptr)
+        cache_entry = None
+    if cache_entry == None:
+        listener = _make_parameters_listener(ptr)
+        device.add_parameters_listener(listener)
+        parameters = None
+    else:
+        (device, parameters, listener) = cache_entry
+    if parameters == None:
+        parameters = _make_device_parameters_unique(device)
+        _unique_parameters.put(ptr,(device, parameters, listener))
+    return parameters
+
+def device_parameters_fingerprint(device, names=True):
+    """Return a fingerprint of the layout of the parameters of a device:
+       it changes whenever a parameter is added, removed, renamed or
+       reordered, or when its range or value items change. Computed in a single
+       pass over device.parameters (and without calling str_for_value),
+       so it is cheap enough to use as (part of) a cache key.
+       (Parameter names need not be made unique first: the unique names
+       follow from the order and names of the parameters.)
+       - device: Live.Device
+       - names: whether to include p.name (the name shown to the user);
+         if False, only the layout of the parameters (including their
+         original names) counts; bool
+       - result: fingerprint (hexadecimal); str
+    """
+    # separators (ASCII unit, record and group separator) that do not
+    # appear in parameter names or value items
+    fields = []
+    for p in device.parameters:
+        fields.append(p.original_name)
+        if names:
+            fields.append(p.name)
+        fields.append(str(p.min))
+        fields.append(str(p.max))
+        if p.is_quantized:
+            fields.append('\x1d'.join(p.value_items))
+        fields.append('\x1e')
+    return hashlib.sha1('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+def _make_device_parameters_unique(device):
     """Return the list device.parameters, in the same order, but making
        original_name and name unique
        - device: Live.Device
@@ -41,7 +134,10 @@ def make_device_parameters_unique(device):
         else:
             original_names[original_name] = 0
             suffix = ''
-        p.__class__ = UniqueParameter
+        # (the names of parameters of offline devices, see DeviceMetadata.py,
+        # can be set directly)
+        if Live:
+            p.__class__ = UniqueParameter
         # This creates instance variables!
         p.original_name = original_name + suffix
         p.name = name + suffix
@@ -0,0 +1,137 @@
+# fingerprint
+# - benchmark device_parameters_fingerprint (see UniqueParameters.py) on
+#   synthetic devices with many parameters
+#
+# Part of ElectraOne.
+#
+# Ableton Live MIDI Remote Script for the Electra One
+#
+# Author: Jaap-henk Hoepman (info@xot.nl)
+#
+# Distributed under the MIT License, see LICENSE
+#
+# Runs outside Live: a minimal stand in for the Live module is installed
+# before the remote script modules are imported. Usage:
+#
+#   python3 benchmarks/fingerprint.py [--parameters 1000] [--devices 20] [--repeat 5]
+
+# Python imports
+import argparse
+import importlib
+import sys
+import time
+import types
+from pathlib import Path
+
+class _DeviceParameter:
+    """Synthetic device parameter (stand in for Live.DeviceParameter)
+    """
+
+    def __init__(self, name, vmin, vmax, is_quantized=False, value_items=()):
+        self.name = name
+        self.original_name = name
+        self.min = vmin
+        self.max = vmax
+        self.value = vmin
+        self.is_quantized = is_quantized
+        self.value_items = list(value_items)
+
+    def str_for_value(self, value):
+        if self.is_quantized:
+            return self.value_items[int(value)]
+        return f'{value:.2f} dB'
+
+class _Device:
+    """Synthetic device (stand in for Live.Device)
+    """
+
+    def __init__(self, name, parameters):
+        self.name = name
+        self.parameters = parameters
+        self.can_have_chains = False
+        self._live_ptr = id(self)
+
+    def add_parameters_listener(self, listener):
+        pass
+
+    def parameters_has_listener(self, listener):
+        return False
+
+    def remove_parameters_listener(self, listener):
+        pass
+
+def _install_live_stub():
+    """Install a minimal Live module, and import the remote script package.
+       - result: the UniqueParameters module
+    """
+    live = types.ModuleType('Live')
+    live.DeviceParameter = types.SimpleNamespace(DeviceParameter=_DeviceParameter)
+    sys.modules['Live'] = live
+    package = types.ModuleType('ElectraOne')
+    package.__path__ = [str(Path(__file__).resolve().parent.parent)]
+    sys.modules['ElectraOne'] = package
+    return importlib.import_module('ElectraOne.UniqueParameters')
+
+def make_device(index, count):
+    """Create a synthetic device: a mix of continuous, quantized and on/off
+       parameters, with some duplicate names.
+       - index: number of the device (used in its name and parameter names); int
+       - count: number of parameters; int
+       - result: the device; _Device
+    """
+    parameters = [_DeviceParameter('Device On', 0, 1, True, ('Off','On'))]
+    for i in range(1, count):
+        kind = i % 4
+        if kind == 0:
+            parameters.append(_DeviceParameter(f'Gain {index}.{i}', -36.0, 36.0))
+        elif kind == 1:
+            parameters.append(_DeviceParameter(f'Mode {index}.{i}', 0, 3, True, ('Off','Low','Mid','High')))
+        elif kind == 2:
+            # duplicate names (made unique by make_device_parameters_unique)
+            parameters.append(_DeviceParameter('Amount', 0.0, 1.0))
+        else:
+            parameters.append(_DeviceParameter(f'Bypass {index}.{i}', 0, 1, True, ('Off','On')))
+    return _Device(f'Synthetic {index}', parameters)
+
+def _by_value_strings(unique_parameters, device):
+    """The alternative: fingerprint the unique parameters including the
+       string representation of their range (one str_for_value call for
+       the minimum and the maximum of every parameter)
+    """
+    parameters = unique_parameters.make_device_parameters_unique(device)
+    return hash(tuple( (p.original_name, p.name, p.str_for_value(p.min), p.str_for_value(p.max))
+                       for p in parameters ))
+
+def _time(f, devices, repeat):
+    """Return the best time (in ms) over repeat runs of f over all devices
+    """
+    best = None
+    for r in range(repeat):
+        start = time.perf_counter()
+        for device in devices:
+            f(device)
+        elapsed = 1000 * (time.perf_counter() - start)
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark device parameter fingerprinting.')
+    parser.add_argument('--parameters', type=int, default=1000, help='parameters per device')
+    parser.add_argument('--devices', type=int, default=20, help='number of devices')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs (best is reported)')
+    args = parser.parse_args(argv)
+    unique_parameters = _install_live_stub()
+    devices = [ make_device(i, args.parameters) for i in range(args.devices) ]
+    fingerprint = unique_parameters.device_parameters_fingerprint
+    # sanity checks: deterministic, and sensitive to a renamed parameter
+    assert fingerprint(devices[0]) == fingerprint(devices[0])
+    before = fingerprint(devices[0])
+    devices[0].parameters[-1].name += ' (renamed)'
+    assert fingerprint(devices[0]) != before
+    per_device = _time(fingerprint, devices, args.repeat) / args.devices
+    print(f'device_parameters_fingerprint: {per_device:.3f} ms per device ({args.parameters} parameters)')
+    per_device = _time(lambda d: _by_value_strings(unique_parameters, d), devices, args.repeat) / args.devices
+    print(f'unique parameters + str_for_value: {per_device:.3f} ms per device ({args.parameters} parameters)')
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,16 @@ E1_LOGGING_PORT = 2
 # to create your own custom patches for certain devices)
 DUMP = False
 
+# Whether the parameter metadata of devices should be exported (to the
+# metadata folder) when they are selected; presets can then be constructed
+# outside Live from this metadata, using PresetCompiler.py
+EXPORT_DEVICE_METADATA = False
+
+# Whether the presets for all devices in the song should be dumped (to the
+# dumps folder, like DUMP) once the E1 is connected. Such a batch dump can
+# also be requested from the E1 (see requestBatchDump in default.lua)
+BATCH_DUMP = False
+
 # Whether to detect the E1 at start up (or assume it's there regardless)
 DETECT_E1 = True
 
@@ -91,6 +101,38 @@ SWITCH_TO_EFFECT_IMMEDIATELY = True
 # controls on the E1 whose string values need to be provided by Abelton
 EFFECT_REFRESH_PERIOD = 2
 
+# Whether to register value listeners on parameters whose string values need
+# to be provided by Ableton (so that only changed parameters are refreshed);
+# if False, all such parameters are polled every EFFECT_REFRESH_PERIOD
+USE_VALUE_LISTENERS = True
+
+# Number of Ableton value strings (for continuous parameters) cached per
+# device, indexed by parameter value, to avoid asking Live to format the
+# same value again (e.g. with looping automation); 0 disables the cache
+VALUE_STRING_CACHE_SIZE = 256
+
+# Whether to send value string updates for several controls at once (using
+# a single LUA command, calling svb() defined in default.lua), instead of one
+# SysEx message per control. Only enable this if the default.lua on the E1
+# defines svb() (when the effect presets are preloaded on the E1, they use
+# the default.lua preloaded there; with an older version all value strings
+# silently fail to update). With firmware 3.7 and later a LUA command is at
+# most 80 characters, so only about 4-5 updates fit in a single command
+# (roughly a 5x reduction of the number of messages)
+BATCH_VALUE_UPDATES = False
+
+# Maximum number of value string updates sent to the E1 per refresh of
+# a device (every EFFECT_REFRESH_PERIOD); updates for controls on the visible
+# page are sent first, the remaining ones in later refreshes;
+# -1 (or any value <= 0) means no maximum
+MAX_VALUE_UPDATES_PER_TICK = 8
+
+# Number of parameters (on pages not currently visible on the E1) to refresh
+# per refresh of a device (every EFFECT_REFRESH_PERIOD) after a full refresh;
+# a full refresh immediately refreshes the visible page only.
+# -1 means all parameters are refreshed immediately
+BACKGROUND_REFRESH_PER_TICK = 36
+
 # Length of time (in 100ms increments) between successive refreshes of
 # session clips on the E1 mixer (E1_DAW only)
 MIXER_CLIPS_REFRESH_PERIOD = 20
@@ -152,6 +194,70 @@ PERSONAL_DEVICE_DICT = {}
 MAX_CC7_PARAMETERS = -1
 MAX_CC14_PARAMETERS = -1
 
+# Whether to keep predefined presets (and their LUA scripts) compressed in
+# memory; they are decompressed when used
+COMPRESS_PRESETS = True
+
+# Whether to minify predefined presets when loading them (removing all
+# whitespace, and fields that have their default value on the E1); this
+# reduces upload time
+MINIFY_PRESETS = True
+
+# Whether presets constructed on the fly omit fields that have their default
+# value on the E1 (like "visible":true); this reduces upload time
+COMPACT_PRESETS = True
+
+# Number of decompressed presets to keep in memory
+PRESET_CACHE_SIZE = 4
+
+# Number of presets constructed on the fly (for devices without a predefined
+# preset) to keep in memory
+GENERATED_PRESET_CACHE_SIZE = 8
+
+# Number of overlays (lists of value items) whose JSON is kept in memory
+# to construct presets on the fly; -1 means no maximum
+OVERLAY_ITEMS_CACHE_SIZE = 256
+
+# Whether to also store presets constructed on the fly on disk (in the cache
+# folder), so they need not be constructed again after restarting Live
+USE_PRESET_DISK_CACHE = True
+
+# Maximum number of presets stored in the disk cache; when exceeded, the
+# least recently used presets are removed. -1 means no maximum
+PRESET_DISK_CACHE_SIZE = 256
+
+# Whether devices with more parameters than fit a single preset (432) are
+# split into groups of pages (each group with its own preset, constructed
+# and uploaded when the user pages to it); otherwise the remaining
+# parameters are not included
+USE_PAGE_GROUPS = True
+
+# Whether parameters of presets constructed on the fly keep their CC
+# assignment when the device changes (e.g. parameters are added or removed
+# in a new version of a plugin), so MIDI mappings and controller layouts
+# remain valid. The assignments are recorded per device in the allocations
+# folder.
+STABLE_CC_ALLOCATION = False
+
+# Whether racks without a predefined preset share a preset template (one
+# for each layout of macros) whose labels are set to the actual macro names
+# after uploading; switching between racks then does not upload a new preset
+USE_RACK_TEMPLATES = True
+
+# Number of devices for which the list of (uniquely named) parameters is
+# kept in memory; 0 disables this cache
+UNIQUE_PARAMETERS_CACHE_SIZE = 16
+
+# Maximum time (in seconds) a full refresh of the effect or mixer preset may
+# take per call to update_display (every 100ms); the remainder of the refresh
+# continues in the next call. -1 means a full refresh is done in one go.
+REFRESH_TIME_BUDGET = 0.005
+
+# Length of time (in 100ms increments) between successive checks whether
+# presets in the preloaded folder changed (and need to be reloaded);
+# -1 means presets are never reloaded
+PRESET_RELOAD_PERIOD = 10
+
 # ===  MIXER CONFIGURATION CONSTANTS 
 
 # E1 preset slot where the master is stored. Specified by bank index (0..5)
@@ -76,6 +76,30 @@ function zz()
   window.resume()
 end
 
+-- set the displayed value of several controls at once:
+-- l = { control id, value text, control id, value text, ... }
+
+function svb(l)
+  for i = 1, #l, 2 do
+    local control = controls.get(l[i])
+    if control then
+      control:getValue("value"):overrideValue(l[i+1])
+    end
+  end
+end
+
+-- set the label of several controls at once:
+-- l = { control id, label, control id, label, ... }
+
+function scl(l)
+  for i = 1, #l, 2 do
+    local control = controls.get(l[i])
+    if control then
+      control:setName(l[i+1])
+    end
+  end
+end
+
 -- handling patch requests to switch between mixer/effect 
 
 function patch.onRequest (device)
@@ -87,3 +111,15 @@ function patch.onRequest (device)
   end
 end
 
+-- request the remote script to dump the presets for all devices in the
+-- song (e.g. call this from the function of a pad)
+
+function requestBatchDump ()
+  midi.sendSysex(PORT_1, {0x00, 0x21, 0x45, 0x7E, 0x7C})
+end
+
+-- report page changes, to let the remote script update the visible page first
+
+function pages.onChange (newPageId, oldPageId)
+  midi.sendSysex(PORT_1, {0x00, 0x21, 0x45, 0x7E, 0x7D, newPageId})
+end